@@ -0,0 +1,253 @@
+"""Batch feature extraction and evaluation with NumPy.
+
+``piece_planes()`` turns N positions (or N packed records) into an
+(N, 12, 64) array with a one for every piece on its square, and
+``batch_features()`` computes material, mobility and piece-square scores for
+the whole batch with array operations. ``position_features()`` is the same
+computation one position at a time through chess_core, used as the
+reference and for speed comparison.
+
+Run ``python -m chess batch games.pgn`` (or a packed positions file) to
+check both paths agree and compare their positions/sec.
+"""
+import argparse
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from chess_core import (Position, KNIGHT, BISHOP, ROOK, QUEEN, BB_FILE_A, KNIGHT_ATTACKS,
+                        piece_targets, popcount)
+from evaluation import MG_VALUES, MG_TABLE, EG_TABLE, PHASE, MAX_PHASE, evaluate
+
+try:
+    import numpy as np
+except ImportError:  # this module needs NumPy; importing it without still works for --help
+    np = None
+
+# Piece types counted for mobility
+MOBILITY_TYPES = (KNIGHT, BISHOP, ROOK, QUEEN)
+# Multiplying a file's bits, shifted down to file a, by this gathers them into the top byte
+_FILE_TO_BYTE = 0x0102040810204080
+# Multiplying a diagonal's bits by this adds every rank into the top byte, each square at its column
+_RANKS_TO_BYTE = 0x0101010101010101
+
+FEATURE_NAMES = ("material", "white_mobility", "black_mobility", "mg", "eg", "phase", "score")
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("This function requires NumPy (pip install numpy)")
+
+
+def piece_planes(positions: List[Position]) -> "np.ndarray":
+    """(N, 12, 64) uint8 planes, plane = piece code, from Position objects"""
+    _require_numpy()
+    squares = np.array([position.squares for position in positions], dtype=np.int8).reshape(-1, 64)
+    return planes_from_squares(squares)
+
+
+def planes_from_squares(squares) -> "np.ndarray":
+    """(N, 12, 64) planes from (N, 64) piece-code arrays (-1 for empty)"""
+    _require_numpy()
+    squares = np.asarray(squares, dtype=np.int8).reshape(-1, 64)
+    planes = np.zeros((len(squares), 12, 64), dtype=np.uint8)
+    boards, occupied = np.nonzero(squares >= 0)
+    planes[boards, squares[boards, occupied], occupied] = 1
+    return planes
+
+
+def planes_from_packed(packed) -> "np.ndarray":
+    """(N, 12, 64) planes straight from packed position records"""
+    from packed import decode_squares
+    return planes_from_squares(decode_squares(packed))
+
+
+def _line_tables():
+    """Attack tables for sliders, worked out on one line of eight squares at a time
+
+    A rank, file or diagonal through a square is squeezed into a byte (see
+    _line_byte()); LINE_ATTACKS[position on the line][occupancy byte] is the
+    byte of squares a slider there reaches, up to and including the first
+    blocker each way. Diagonals are shorter than eight squares, so
+    DIAGONAL_GAPS holds the columns a square's diagonals miss, which are set
+    in both the occupancy and own-piece bytes to act as own pieces.
+    """
+    line_attacks = np.zeros((8, 256), dtype=np.uint8)
+    for position in range(8):
+        for occupied in range(256):
+            for step in (-1, 1):
+                target = position + step
+                while 0 <= target < 8:
+                    line_attacks[position, occupied] |= 1 << target
+                    if occupied >> target & 1:
+                        break
+                    target += step
+    squares = np.arange(64)
+    rows, cols = squares // 8, squares % 8
+    diagonal_masks, diagonal_gaps = [], []
+    for line in (rows - cols, rows + cols):
+        on_line = line[:, None] == line[None, :]       # [square, other square on its diagonal]
+        diagonal_masks.append(np.bitwise_or.reduce(
+            np.where(on_line, np.uint64(1) << squares.astype(np.uint64), np.uint64(0)), axis=1))
+        diagonal_gaps.append(255 & ~np.bitwise_or.reduce(np.where(on_line, 1 << cols, 0), axis=1))
+    return line_attacks, np.array(diagonal_masks), np.array(diagonal_gaps, dtype=np.uint64)
+
+
+if np is not None:
+    LINE_ATTACKS, DIAGONAL_MASKS, DIAGONAL_GAPS = _line_tables()
+    KNIGHT_BITBOARDS = np.array(KNIGHT_ATTACKS, dtype=np.uint64)
+    POPCOUNT_BYTE = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def _bitboards(planes: "np.ndarray") -> "np.ndarray":
+    """(N,) uint64 bitboards of the squares set in any of the given (N, k, 64) planes"""
+    return np.packbits(planes.any(axis=1), axis=1, bitorder="little").view("<u8").ravel()
+
+
+def _piece_squares(planes: "np.ndarray", piece_type: int) -> Tuple["np.ndarray", ...]:
+    """(boards, colors, squares) of every piece of one type, searched eight squares at a time
+
+    planes must be C-contiguous uint8; each plane is read as eight 64-bit
+    words, so only the words holding a piece are looked into byte by byte.
+    """
+    words = planes.view(np.uint64)[:, piece_type::6].reshape(-1)        # (N * 2 * 8,)
+    found = np.flatnonzero(words)
+    pieces, offsets = np.nonzero(words[found].view(np.uint8).reshape(-1, 8))
+    boards, colors, word_index = np.unravel_index(found[pieces], (len(planes), 2, 8))
+    return boards, colors, word_index * 8 + offsets
+
+
+def _popcount(bitboards: "np.ndarray") -> "np.ndarray":
+    return POPCOUNT_BYTE[bitboards.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.int64)
+
+
+def _line_byte(bitboards: "np.ndarray", magic: int) -> "np.ndarray":
+    """The top byte of bitboards * magic, wrapping at 64 bits"""
+    return bitboards * np.uint64(magic) >> np.uint64(56)
+
+
+def _line_moves(position, occupied, own) -> "np.ndarray":
+    """Moves along one line from its occupancy and own-piece bytes"""
+    return POPCOUNT_BYTE[LINE_ATTACKS[position, occupied] & ~own.astype(np.uint8)].astype(np.int64)
+
+
+def _mobility(planes: "np.ndarray") -> "np.ndarray":
+    """(2, N) moves of each color's knights, bishops, rooks and queens to squares not holding its own pieces
+
+    Works on uint64 bitboards, one per board: a knight's moves come from its
+    attack bitboard, a slider's from LINE_ATTACKS for each line it moves
+    along, so the cost grows with the number of pieces and not with the
+    distance they travel.
+    """
+    count = len(planes)
+    occupied_boards = _bitboards(planes)
+    own_boards = np.stack([_bitboards(planes[:, :6]), _bitboards(planes[:, 6:])])
+    mobility = np.zeros(2 * count, dtype=np.int64)
+    for piece_type in MOBILITY_TYPES:
+        # The piece's white and black planes: colors is 0 or 1 for each piece found
+        boards, colors, squares = _piece_squares(planes, piece_type)
+        occupied = occupied_boards[boards]
+        own = own_boards[colors, boards]
+        if piece_type == KNIGHT:
+            moves = _popcount(KNIGHT_BITBOARDS[squares] & ~own)
+        else:
+            rows = squares // 8
+            cols = squares % 8
+            moves = np.zeros(len(boards), dtype=np.int64)
+            if piece_type != BISHOP:
+                rank_shift = (rows * 8).astype(np.uint64)
+                moves += _line_moves(cols, occupied >> rank_shift & 255, own >> rank_shift & 255)
+                file_shift = cols.astype(np.uint64)
+                moves += _line_moves(rows, _line_byte(occupied >> file_shift & BB_FILE_A, _FILE_TO_BYTE),
+                                     _line_byte(own >> file_shift & BB_FILE_A, _FILE_TO_BYTE))
+            if piece_type != ROOK:
+                for masks, gaps in zip(DIAGONAL_MASKS, DIAGONAL_GAPS):
+                    mask, gap = masks[squares], gaps[squares]
+                    moves += _line_moves(cols, _line_byte(occupied & mask, _RANKS_TO_BYTE) | gap,
+                                         _line_byte(own & mask, _RANKS_TO_BYTE) | gap)
+        mobility += np.bincount(colors * count + boards, weights=moves, minlength=2 * count).astype(np.int64)
+    return mobility.reshape(2, count)
+
+
+def batch_features(planes: "np.ndarray", sides) -> Dict[str, "np.ndarray"]:
+    """Features of every position in a batch; sides holds the side to move (0 white, 1 black)
+
+    material is white minus black in middlegame piece values; mg and eg are
+    the white-minus-black piece-square sums and score the tapered evaluation
+    from the side to move's point of view, as in evaluation.evaluate().
+    """
+    _require_numpy()
+    planes = np.ascontiguousarray(planes, dtype=np.uint8)
+    sides = np.asarray(sides, dtype=np.int64)
+    counts = planes.sum(axis=2, dtype=np.int64)                     # (N, 12)
+    values = np.array(MG_VALUES + tuple(-value for value in MG_VALUES), dtype=np.int64)
+    mg = np.einsum("npk,pk->n", planes, np.array(MG_TABLE, dtype=np.int64))
+    eg = np.einsum("npk,pk->n", planes, np.array(EG_TABLE, dtype=np.int64))
+    phase = counts @ np.array(PHASE, dtype=np.int64)
+    tapered = np.minimum(phase, MAX_PHASE)
+    score = (mg * tapered + eg * (MAX_PHASE - tapered)) // MAX_PHASE
+    mobility = _mobility(planes)
+    return {
+        "material": counts @ values,
+        "white_mobility": mobility[0],
+        "black_mobility": mobility[1],
+        "mg": mg,
+        "eg": eg,
+        "phase": phase,
+        "score": np.where(sides == 0, score, -score),
+    }
+
+
+def position_features(position: Position) -> Tuple[int, ...]:
+    """The batch_features() values for one position, in FEATURE_NAMES order"""
+    pieces = position.pieces
+    material = sum(MG_VALUES[piece_type] * (popcount(pieces[piece_type]) - popcount(pieces[6 + piece_type]))
+                   for piece_type in range(6))
+    mobility = [0, 0]
+    for color in (0, 1):
+        for sq in position.piece_lists[color]:
+            if position.squares[sq] % 6 in MOBILITY_TYPES:
+                mobility[color] += popcount(piece_targets(position, sq))
+    return (material, mobility[0], mobility[1], position.mg, position.eg, position.phase,
+            evaluate(position))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess batch",
+                                     description="Compare batch and per-position feature extraction")
+    parser.add_argument("source", help="PGN file, or packed positions file (.bin)")
+    parser.add_argument("--limit", type=int, default=100_000, help="positions to use at most")
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error("NumPy is required (pip install numpy)")
+
+    from itertools import islice
+    from packed import read_positions, game_positions
+    if args.source.endswith(".bin"):
+        positions = list(islice(read_positions(args.source), args.limit))
+    else:
+        from pgn import open_games
+        positions = list(islice(game_positions(open_games(args.source)), args.limit))
+
+    start = time.perf_counter()
+    expected = [position_features(position) for position in positions]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planes = piece_planes(positions)
+    features = batch_features(planes, [position.side for position in positions])
+    batch_time = time.perf_counter() - start
+
+    got = np.stack([features[name] for name in FEATURE_NAMES], axis=1)
+    mismatches = int((got != np.array(expected, dtype=np.int64)).any(axis=1).sum())
+    count = len(positions)
+    print(f"{count} positions, planes array {planes.nbytes:,} bytes")
+    print(f"Per position: {single_time:.2f}s ({count / max(single_time, 1e-9):,.0f} positions/sec)")
+    print(f"Batch:        {batch_time:.2f}s ({count / max(batch_time, 1e-9):,.0f} positions/sec), "
+          f"{single_time / max(batch_time, 1e-9):.1f}x")
+    print("All features match" if not mismatches else f"{mismatches} positions differ")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
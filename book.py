@@ -0,0 +1,168 @@
+"""Memory-mapped opening book.
+
+A book file is a sorted array of fixed-size (Zobrist key, move, weight)
+records. ``OpeningBook`` maps the file with ``mmap`` and finds a position's
+moves by binary search on the key, so opening a book costs no parsing and a
+lookup reads only the pages it touches. ``build_book()`` creates a book from
+PGN games, keeping moves played within the first ``max_ply`` plies at least
+``min_count`` times.
+
+Run through the CLI, e.g. ``python -m chess book build games.pgn book.bin``
+and ``python -m chess book probe book.bin --fen "..."``.
+"""
+import argparse
+import mmap
+import random
+import struct
+import sys
+import time
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from chess_core import (Position, STARTING_FEN, IllegalMoveError, make_move, parse_san,
+                        generate_legal_moves, move_name)
+
+# key (8 bytes), move (2 bytes), weight (2 bytes), little-endian
+RECORD = struct.Struct("<QHH")
+RECORD_SIZE = RECORD.size
+MAX_WEIGHT = 0xFFFF
+
+DEFAULT_MAX_PLY = 16
+DEFAULT_MIN_COUNT = 2
+
+
+class OpeningBook:
+    """Read-only view of a book file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = self._file.seek(0, 2)
+        if size % RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path} is not a book file: size {size} is not a multiple of {RECORD_SIZE}")
+        self.count = size // RECORD_SIZE
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key_at(self, index: int) -> int:
+        return RECORD.unpack_from(self._map, index * RECORD_SIZE)[0]
+
+    def entries(self, key: int) -> List[Tuple[int, int]]:
+        """(move, weight) records stored for a Zobrist key"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        found = []
+        for index in range(low, self.count):
+            record_key, move, weight = RECORD.unpack_from(self._map, index * RECORD_SIZE)
+            if record_key != key:
+                break
+            found.append((move, weight))
+        return found
+
+    def moves(self, position: Position) -> List[Tuple[int, int]]:
+        """Legal book moves for a position with their weights"""
+        legal = generate_legal_moves(position, position.turn)
+        # Guard against key collisions and books built from other positions
+        return [(move, weight) for move, weight in self.entries(position.key) if move in legal]
+
+    def choose(self, position: Position, rng: Optional[random.Random] = None) -> Optional[int]:
+        """Pick a book move at random in proportion to its weight, or None if out of book"""
+        candidates = self.moves(position)
+        if not candidates:
+            return None
+        moves, weights = zip(*candidates)
+        return (rng or random).choices(moves, weights)[0]
+
+
+def build_book(games: Iterable, path: str, max_ply: int = DEFAULT_MAX_PLY,
+               min_count: int = DEFAULT_MIN_COUNT) -> Tuple[int, int]:
+    """Write a book from PGN games; returns (games read, records written)
+
+    Each move played in the first max_ply plies of a game counts once; moves
+    seen fewer than min_count times are left out and the weight is the count.
+    """
+    counts: Counter = Counter()
+    game_count = 0
+    for game_count, game in enumerate(games, start=1):
+        position = Position.from_fen(game.headers.get("FEN", STARTING_FEN))
+        for san in game.moves[:max_ply]:
+            try:
+                move = parse_san(position, san)
+            except IllegalMoveError:
+                break
+            counts[position.key, move] += 1
+            make_move(position, move)
+
+    records = sorted((key, move, min(count, MAX_WEIGHT))
+                     for (key, move), count in counts.items() if count >= min_count)
+    with open(path, "wb") as f:
+        for record in records:
+            f.write(RECORD.pack(*record))
+    return game_count, len(records)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess book", description="Build or probe an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="create a book from PGN files")
+    build.add_argument("pgn", nargs="+", help="PGN files to read")
+    build.add_argument("output", help="book file to write")
+    build.add_argument("--max-ply", type=int, default=DEFAULT_MAX_PLY,
+                       help="only count moves in the first this many plies")
+    build.add_argument("--min-count", type=int, default=DEFAULT_MIN_COUNT,
+                       help="drop moves played fewer times than this")
+    probe = commands.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("book", help="book file to read")
+    probe.add_argument("--fen", default=STARTING_FEN, help="position to look up")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        from pgn import open_games
+
+        def all_games():
+            for path in args.pgn:
+                yield from open_games(path)
+
+        start = time.perf_counter()
+        games, records = build_book(all_games(), args.output, args.max_ply, args.min_count)
+        print(f"Read {games} games, wrote {records} records ({records * RECORD_SIZE:,} bytes) "
+              f"in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    try:
+        position = Position.from_fen(args.fen)
+    except ValueError as e:
+        parser.error(str(e))
+    with OpeningBook(args.book) as book:
+        start = time.perf_counter()
+        moves = book.moves(position)
+        seconds = time.perf_counter() - start
+        total = sum(weight for _, weight in moves)
+        for move, weight in sorted(moves, key=lambda entry: -entry[1]):
+            print(f"{move_name(move)}: {weight} ({weight / total:.1%})")
+        print(f"{len(moves)} book moves among {len(book)} records, lookup {seconds * 1e6:.0f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
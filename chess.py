@@ -1,176 +1,19 @@
-from typing import List, Tuple, Dict
-from copy import deepcopy
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import List, Dict, Optional
 
-# Constants for pieces and colors
-WHITE = "white"
-BLACK = "black"
+from chess_core import (WHITE, BLACK, IllegalMoveError, create_board, from_board, to_board,
+                        parse_move, make_move, legal_moves, is_in_check, move_name, draw_reason)
+from search import search, DEFAULT_TIME_LIMIT
+from tt import TranspositionTable, DEFAULT_HASH_MB
+from book import OpeningBook
+from instrument import SessionStats, add_arguments, instrumented
 
-# Piece symbols
-#dictonary
-PIECES = {
-    "P": "pawn",
-    "R": "rook", 
-    "N": "knight",
-    "B": "bishop",
-    "Q": "queen",
-    "K": "king"
-}
-
-def create_piece(piece_type: str, color: str) -> Dict:
-    """Create a piece dictionary with type, color and moved status"""
-    return {
-        "type": piece_type,
-        "color": color,
-        "has_moved": False
-    }
-
-def create_board() -> List[List[Dict]]:
-    """Create and initialize chess board"""
-    board = [[None for _ in range(8)] for _ in range(8)]
-    
-    # Set up pawns
-    for col in range(8):
-        board[1][col] = create_piece("P", BLACK)
-        board[6][col] = create_piece("P", WHITE)
-    
-    # Set up other pieces
-    piece_order = ["R", "N", "B", "Q", "K", "B", "N", "R"]
-    for col in range(8):
-        board[0][col] = create_piece(piece_order[col], BLACK)
-        board[7][col] = create_piece(piece_order[col], WHITE)
-        
-    return board
-
-def is_valid_pawn_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]], piece: Dict) -> bool:
-    """Check if pawn move is valid"""
-    start_row, start_col = start
-    end_row, end_col = end
-    direction = -1 if piece["color"] == WHITE else 1
-    
-    # Moving straight
-    if start_col == end_col:
-        if end_row == start_row + direction and not board[end_row][end_col]:
-            return True
-        if (not piece["has_moved"] and 
-            end_row == start_row + 2 * direction and 
-            not board[end_row][end_col] and 
-            not board[start_row + direction][start_col]):
-            return True
-    
-    # Capturing
-    elif (abs(start_col - end_col) == 1 and 
-          end_row == start_row + direction and 
-          board[end_row][end_col] and 
-          board[end_row][end_col]["color"] != piece["color"]):
-        return True
-    
-    return False
-
-def is_valid_rook_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]]) -> bool:
-    """Check if rook move is valid"""
-    start_row, start_col = start
-    end_row, end_col = end
-    
-    if start_row != end_row and start_col != end_col:
-        return False
-        
-    row_step = 0 if start_row == end_row else (end_row - start_row) // abs(end_row - start_row)
-    col_step = 0 if start_col == end_col else (end_col - start_col) // abs(end_col - start_col)
-    
-    curr_row, curr_col = start_row + row_step, start_col + col_step
-    while (curr_row, curr_col) != (end_row, end_col):
-        if board[curr_row][curr_col]:
-            return False
-        curr_row += row_step
-        curr_col += col_step
-    
-    return True
-
-def is_valid_knight_move(start: Tuple[int, int], end: Tuple[int, int]) -> bool:
-    """Check if knight move is valid"""
-    row_diff = abs(end[0] - start[0])
-    col_diff = abs(end[1] - start[1])
-    return (row_diff == 2 and col_diff == 1) or (row_diff == 1 and col_diff == 2)
-
-def is_valid_bishop_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]]) -> bool:
-    """Check if bishop move is valid"""
-    start_row, start_col = start
-    end_row, end_col = end
-    
-    if abs(end_row - start_row) != abs(end_col - start_col):
-        return False
-        
-    row_step = (end_row - start_row) // abs(end_row - start_row)
-    col_step = (end_col - start_col) // abs(end_col - start_col)
-    
-    curr_row, curr_col = start_row + row_step, start_col + col_step
-    while (curr_row, curr_col) != (end_row, end_col):
-        if board[curr_row][curr_col]:
-            return False
-        curr_row += row_step
-        curr_col += col_step
-    
-    return True
-
-def is_valid_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]], piece: Dict) -> bool:
-    """Check if a move is valid for given piece"""
-    if not (0 <= end[0] < 8 and 0 <= end[1] < 8):
-        return False
-        
-    if board[end[0]][end[1]] and board[end[0]][end[1]]["color"] == piece["color"]:
-        return False
-        
-    piece_type = piece["type"]
-    
-    if piece_type == "P":
-        return is_valid_pawn_move(start, end, board, piece)
-    elif piece_type == "R":
-        return is_valid_rook_move(start, end, board)
-    elif piece_type == "N":
-        return is_valid_knight_move(start, end)
-    elif piece_type == "B":
-        return is_valid_bishop_move(start, end, board)
-    elif piece_type == "Q":
-        return is_valid_rook_move(start, end, board) or is_valid_bishop_move(start, end, board)
-    elif piece_type == "K":
-        return abs(end[0] - start[0]) <= 1 and abs(end[1] - start[1]) <= 1
-    
-    return False
-
-def find_king(board: List[List[Dict]], color: str) -> Tuple[int, int]:
-    """Find position of king with given color"""
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece["type"] == "K" and piece["color"] == color:
-                return (row, col)
-    return (-1, -1)
-
-def is_in_check(board: List[List[Dict]], color: str) -> bool:
-    """Check if given color's king is in check"""
-    king_pos = find_king(board, color)
-    opponent_color = BLACK if color == WHITE else WHITE
-    
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece["color"] == opponent_color:
-                if is_valid_move((row, col), king_pos, board, piece):
-                    return True
-    return False
-
-def parse_position(pos_str: str) -> Tuple[int, int]:
-    """Convert chess notation to board coordinates"""
-    if len(pos_str) != 2:
-        raise ValueError("Position should be letter + number (e.g., 'e2')")
-    
-    col = ord(pos_str[0].lower()) - ord('a')
-    row = 8 - int(pos_str[1])
-    
-    if not (0 <= row < 8 and 0 <= col < 8):
-        raise ValueError("Position must be between a1 and h8")
-        
-    return (row, col)
+# Modules the headless core must not pull in at import time
+HEAVY_MODULES = ("tkinter", "copy")
 
 def print_board(board: List[List[Dict]]):
     """Display the chess board"""
@@ -189,61 +32,133 @@ def print_board(board: List[List[Dict]]):
         print(f"{8-row}")
     print("  a b c d e f g h")
 
-def play_chess():
-    """Main game function"""
-    board = create_board()
+def play_chess(engine_color: Optional[str] = None, think_time: float = DEFAULT_TIME_LIMIT,
+               hash_mb: float = DEFAULT_HASH_MB, threads: int = 1, book_path: Optional[str] = None,
+               stats: Optional[SessionStats] = None):
+    """Main game function; engine_color lets the computer play that side
+
+    Move times and node counts are recorded in stats when one is given.
+    """
+    position = from_board(create_board())
+    tt = TranspositionTable(hash_mb) if engine_color else None
+    if stats is not None:
+        stats.tt = tt
+    book = OpeningBook(book_path) if engine_color and book_path else None
     current_turn = WHITE
     
     print("\nWelcome to Python Chess!")
     print("Enter moves like: e2 e4")
+    print("Add q, r, b or n to choose a promotion piece (e.g., 'e7 e8n')")
     print("Type 'quit' to end game")
     print("\nPieces: P=Pawn, R=Rook, N=Knight, B=Bishop, Q=Queen, K=King")
     print("White pieces are uppercase, black pieces are lowercase")
     
     while True:
-        print_board(board)
+        print_board(to_board(position))
+
+        if not legal_moves(position, current_turn):
+            if is_in_check(position, current_turn):
+                winner = BLACK if current_turn == WHITE else WHITE
+                print(f"\nCheckmate! {winner} wins")
+            else:
+                print("\nStalemate! The game is a draw")
+            break
+        reason = draw_reason(position)
+        if reason:
+            print(f"\nDraw by {reason}")
+            break
+
         print(f"\n{current_turn}'s turn")
+        turn_start = time.perf_counter()
+
+        if current_turn == engine_color:
+            book_move = book.choose(position) if book else None
+            if book_move is not None:
+                if stats is not None:
+                    stats.record_move("book", time.perf_counter() - turn_start)
+                print(f"Engine plays {move_name(book_move)} (book)")
+                make_move(position, book_move)
+                current_turn = BLACK if current_turn == WHITE else WHITE
+                continue
+            result = search(position, time_limit=think_time, tt=tt, threads=threads)
+            if stats is not None:
+                stats.record_move("engine", time.perf_counter() - turn_start, result.nodes)
+            print(f"Engine plays {move_name(result.move)} "
+                  f"(depth {result.depth}, score {result.score}, {result.nodes} nodes)")
+            make_move(position, result.move)
+            current_turn = BLACK if current_turn == WHITE else WHITE
+            continue
         
         move = input("Enter move (e.g., 'e2 e4'): ").lower().strip()
         if move == "quit":
             break
             
         try:
-            start_str, end_str = move.split()
-            start = parse_position(start_str)
-            end = parse_position(end_str)
-            
-            piece = board[start[0]][start[1]]
-            if not piece:
-                print("No piece at starting position")
-                continue
-                
-            if piece["color"] != current_turn:
-                print(f"It's {current_turn}'s turn")
-                continue
-            
-            # Test move
-            test_board = deepcopy(board)
-            if not is_valid_move(start, end, test_board, piece):
-                print("Invalid move for this piece")
-                continue
-                
-            test_board[end[0]][end[1]] = test_board[start[0]][start[1]]
-            test_board[start[0]][start[1]] = None
-            
-            if is_in_check(test_board, current_turn):
-                print("Move would put/leave king in check")
-                continue
-            
-            # Make actual move
-            board[end[0]][end[1]] = board[start[0]][start[1]]
-            board[start[0]][start[1]] = None
-            board[end[0]][end[1]]["has_moved"] = True
-            
-            current_turn = BLACK if current_turn == WHITE else WHITE
-            
-        except (ValueError, IndexError) as e:
-            print(f"Invalid input: {e}")
+            make_move(position, parse_move(position, move))
+        except IllegalMoveError as e:
+            print(e)
+            continue
+        if stats is not None:
+            stats.record_move("player", time.perf_counter() - turn_start)
+        current_turn = BLACK if current_turn == WHITE else WHITE
+
+def measure_import(module: str = "chess_core", runs: int = 5) -> bool:
+    """Time importing module in fresh interpreters and check it stays headless"""
+    code = ("import sys, time; start = time.perf_counter(); import %s; "
+            "print(time.perf_counter() - start); print(' '.join(sys.modules))" % module)
+    times = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        seconds, modules = output.splitlines()
+        times.append(float(seconds))
+    loaded = [name for name in HEAVY_MODULES if name in modules.split()]
+    print(f"import {module}: best {min(times) * 1000:.1f} ms of {runs} runs, "
+          f"{len(modules.split())} modules loaded")
+    print(f"Loaded {', '.join(loaded)}" if loaded else f"Does not load {', '.join(HEAVY_MODULES)}")
+    return not loaded
 
 if __name__ == "__main__":
-    play_chess()
\ No newline at end of file
+    if sys.argv[1:2] == ["perft"]:
+        from perft import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["validate"]:
+        from pgn import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["pack"]:
+        from packed import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["book"]:
+        from book import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["uci"]:
+        from uci import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["serve"]:
+        from server import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["eval"]:
+        from evaluation import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["tablebase"]:
+        from tablebase import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["batch"]:
+        from batch import main
+        sys.exit(main(sys.argv[2:]))
+    if sys.argv[1:2] == ["import-time"]:
+        sys.exit(0 if all(measure_import(module) for module in sys.argv[2:] or ["chess_core"]) else 1)
+
+    parser = argparse.ArgumentParser(description="Play chess in the terminal")
+    parser.add_argument("--engine", choices=[WHITE, BLACK], help="let the computer play this color")
+    parser.add_argument("--think", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="seconds the computer may think per move")
+    parser.add_argument("--hash", type=float, default=DEFAULT_HASH_MB,
+                        help="transposition table size in MB")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="search processes sharing the transposition table")
+    parser.add_argument("--book", help="opening book file the computer plays from before searching")
+    add_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args.stats, args.profile) as stats:
+        play_chess(args.engine, args.think, args.hash, args.threads, args.book, stats)
\ No newline at end of file
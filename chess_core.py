@@ -0,0 +1,1207 @@
+"""Bitboard position representation and chess rules.
+
+Squares are numbered ``row * 8 + col`` using the same (row, col) coordinates
+as the list-of-dicts board, so a8 is square 0 and h1 is square 63.
+"""
+import sys
+import time
+from collections import OrderedDict
+from typing import List, Tuple, Dict, Optional
+
+from evaluation import MG_TABLE, EG_TABLE, PHASE
+
+# Constants for pieces and colors
+WHITE = "white"
+BLACK = "black"
+COLORS = (WHITE, BLACK)
+
+PIECES = {
+    "P": "pawn",
+    "R": "rook",
+    "N": "knight",
+    "B": "bishop",
+    "Q": "queen",
+    "K": "king"
+}
+
+# Piece type indices; a piece code is ``color_index * 6 + piece_type``
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_TYPES = "PNBRQK"
+PIECE_SYMBOLS = "PNBRQKpnbrqk"
+# Suffixes accepted after a promoting move, as in 'e7 e8q'
+PROMOTION_SYMBOLS = {"q": QUEEN, "r": ROOK, "b": BISHOP, "n": KNIGHT}
+
+BB_ALL = (1 << 64) - 1
+BB_FILE_A = sum(1 << (row * 8) for row in range(8))
+BB_LIGHT_SQUARES = sum(1 << sq for sq in range(64) if (sq // 8 + sq % 8) % 2 == 0)
+
+# Row on which each color's pawns start (rank 2 for white, rank 7 for black)
+PAWN_START_ROW = (6, 1)
+# Row a pawn of each color promotes on
+PROMOTION_ROW = (0, 7)
+
+# Castling rights bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# (right, king from, king to, rook from, rook to, squares that must be empty, squares that must not be attacked)
+CASTLING_MOVES = (
+    (WHITE_KINGSIDE, 60, 62, 63, 61, (61, 62), (60, 61, 62)),
+    (WHITE_QUEENSIDE, 60, 58, 56, 59, (57, 58, 59), (60, 59, 58)),
+    (BLACK_KINGSIDE, 4, 6, 7, 5, (5, 6), (4, 5, 6)),
+    (BLACK_QUEENSIDE, 4, 2, 0, 3, (1, 2, 3), (4, 3, 2)),
+)
+# Castling rights letters used in FEN
+FEN_CASTLING = {"K": WHITE_KINGSIDE, "Q": WHITE_QUEENSIDE, "k": BLACK_KINGSIDE, "q": BLACK_QUEENSIDE}
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Position.pack() layout: occupancy bitboard (8 bytes, little-endian), a 4-bit
+# piece code per occupied square in square order (16 bytes), side to move |
+# castling << 1 (1 byte), en passant square or 255 (1 byte), halfmove clock
+# capped at 255 (1 byte), then zero padding
+PACKED_SIZE = 32
+
+# Halfmove clock value at which the fifty-move rule draws the game
+FIFTY_MOVE_PLIES = 100
+
+# Rook (from, to) squares for a castling move, keyed by the king's destination
+CASTLING_ROOK_SQUARES = {king_to: (rook_from, rook_to)
+                         for _, _, king_to, rook_from, rook_to, _, _ in CASTLING_MOVES}
+# Rights kept after a move touches a square (king or rook leaving or being captured)
+CASTLING_KEEP = [15] * 64
+CASTLING_KEEP[60] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEEP[63] &= ~WHITE_KINGSIDE
+CASTLING_KEEP[56] &= ~WHITE_QUEENSIDE
+CASTLING_KEEP[4] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[7] &= ~BLACK_KINGSIDE
+CASTLING_KEEP[0] &= ~BLACK_QUEENSIDE
+
+
+def square(row: int, col: int) -> int:
+    """Convert board coordinates to a square index"""
+    return row * 8 + col
+
+
+def square_coords(sq: int) -> Tuple[int, int]:
+    """Convert a square index to board coordinates"""
+    return divmod(sq, 8)
+
+
+def square_name(sq: int) -> str:
+    """Convert a square index to chess notation (e.g., 'e2')"""
+    row, col = divmod(sq, 8)
+    return "abcdefgh"[col] + str(8 - row)
+
+
+def parse_square(name: str) -> int:
+    """Convert chess notation (e.g., 'e2') to a square index"""
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError(f"Invalid square: {name!r}")
+    return (8 - int(name[1])) * 8 + "abcdefgh".index(name[0])
+
+
+def color_index(color: str) -> int:
+    """Map a color name to its bitboard index"""
+    return 0 if color == WHITE else 1
+
+
+def lsb(bb: int) -> int:
+    """Index of the lowest set bit"""
+    return (bb & -bb).bit_length() - 1
+
+
+def popcount(bb: int) -> int:
+    """Number of set bits in a bitboard"""
+    return bin(bb).count("1")
+
+
+def iter_squares(bb: int):
+    """Yield the square of every set bit in a bitboard"""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _leaper_attacks(offsets) -> List[int]:
+    table = []
+    for sq in range(64):
+        row, col = square_coords(sq)
+        attacks = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                attacks |= 1 << square(r, c)
+        table.append(attacks)
+    return table
+
+
+KNIGHT_ATTACKS = _leaper_attacks(
+    ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)))
+KING_ATTACKS = _leaper_attacks(
+    ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)))
+# Squares attacked by a pawn of each color standing on a square
+PAWN_ATTACKS = (_leaper_attacks(((-1, -1), (-1, 1))),
+                _leaper_attacks(((1, -1), (1, 1))))
+
+# Ray directions as (row step, col step); the first four are rook directions
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+# Rays running towards higher square indices find their first blocker at the lowest bit
+RAY_INCREASING = tuple(dr > 0 or (dr == 0 and dc > 0) for dr, dc in DIRECTIONS)
+
+
+def _rays(dr: int, dc: int) -> List[int]:
+    table = []
+    for sq in range(64):
+        row, col = square_coords(sq)
+        ray = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            ray |= 1 << square(r, c)
+            r, c = r + dr, c + dc
+        table.append(ray)
+    return table
+
+
+RAYS = [_rays(dr, dc) for dr, dc in DIRECTIONS]
+
+
+def _between() -> List[List[int]]:
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        for direction in range(8):
+            for target in iter_squares(RAYS[direction][sq]):
+                table[sq][target] = RAYS[direction][sq] & ~RAYS[direction][target] & ~(1 << target)
+    return table
+
+
+# Squares strictly between two squares on a shared line, 0 if they are not aligned
+BETWEEN = _between()
+
+
+def _zobrist_numbers(count: int, seed: int = 0x9E3779B97F4A7C15) -> List[int]:
+    """Deterministic 64-bit pseudo-random numbers (splitmix64)"""
+    numbers = []
+    state = seed
+    for _ in range(count):
+        state = (state + 0x9E3779B97F4A7C15) & BB_ALL
+        z = state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & BB_ALL
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & BB_ALL
+        numbers.append(z ^ (z >> 31))
+    return numbers
+
+
+_numbers = _zobrist_numbers(12 * 64 + 1 + 15 + 8)
+ZOBRIST_PIECES = [_numbers[code * 64:code * 64 + 64] for code in range(12)]
+ZOBRIST_SIDE = _numbers[768]       # mixed in when black is to move
+ZOBRIST_CASTLING = [0] + _numbers[769:784]  # indexed by the castling rights bits
+ZOBRIST_EP = _numbers[784:792]     # indexed by the en passant file
+del _numbers
+
+
+def _state_key(castling: int, ep_square: int) -> int:
+    """Zobrist contribution of castling rights and the en passant square"""
+    key = ZOBRIST_CASTLING[castling]
+    if ep_square >= 0:
+        key ^= ZOBRIST_EP[ep_square & 7]
+    return key
+
+
+def _relevant_mask(sq: int, directions) -> int:
+    """Squares whose occupancy can change a slider's attacks (ray ends excluded)"""
+    mask = 0
+    for direction in directions:
+        ray = RAYS[direction][sq]
+        if ray:
+            end = lsb(ray) if not RAY_INCREASING[direction] else ray.bit_length() - 1
+            mask |= ray & ~(1 << end)
+    return mask
+
+
+ROOK_MASKS = [_relevant_mask(sq, ROOK_DIRECTIONS) for sq in range(64)]
+BISHOP_MASKS = [_relevant_mask(sq, BISHOP_DIRECTIONS) for sq in range(64)]
+
+# Slider attack sets memoised per square by relevant occupancy, filled on demand
+_ROOK_CACHE: List[Dict[int, int]] = [{} for _ in range(64)]
+_BISHOP_CACHE: List[Dict[int, int]] = [{} for _ in range(64)]
+
+
+def _ray_attacks(sq: int, occupied: int, directions) -> int:
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][sq]
+        blockers = ray & occupied
+        if blockers:
+            if RAY_INCREASING[direction]:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[direction][first]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    """Squares a rook on sq attacks given the occupancy"""
+    key = occupied & ROOK_MASKS[sq]
+    cache = _ROOK_CACHE[sq]
+    attacks = cache.get(key)
+    if attacks is None:
+        attacks = cache[key] = _ray_attacks(sq, key, ROOK_DIRECTIONS)
+    return attacks
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    """Squares a bishop on sq attacks given the occupancy"""
+    key = occupied & BISHOP_MASKS[sq]
+    cache = _BISHOP_CACHE[sq]
+    attacks = cache.get(key)
+    if attacks is None:
+        attacks = cache[key] = _ray_attacks(sq, key, BISHOP_DIRECTIONS)
+    return attacks
+
+
+class Position:
+    """Chess position stored as twelve piece bitboards plus occupancy sets
+
+    A square-indexed piece array, per-color piece lists, the two king
+    squares and the evaluation sums are kept alongside the bitboards by
+    put_piece/remove_piece, so make_move/unmake_move maintain them
+    incrementally.
+    """
+
+    __slots__ = ("pieces", "occupancy", "side", "castling", "ep_square",
+                 "squares", "piece_lists", "king_squares", "key", "mg", "eg", "phase",
+                 "halfmove", "history")
+
+    def __init__(self):
+        self.pieces = [0] * 12       # one bitboard per piece code
+        self.occupancy = [0, 0]      # white and black occupancy
+        self.side = 0                # color index of the side to move
+        self.castling = 0            # castling rights bits
+        self.ep_square = -1          # square a pawn may capture en passant onto
+        self.squares = [-1] * 64     # piece code on each square, -1 if empty
+        self.piece_lists = (set(), set())  # occupied squares of each color
+        self.king_squares = [-1, -1]
+        self.key = 0                 # Zobrist hash of the position
+        self.mg = 0                  # middlegame score sum, white minus black (see evaluation.py)
+        self.eg = 0                  # endgame score sum
+        self.phase = 0               # game phase from the remaining pieces
+        self.halfmove = 0            # plies since the last capture or pawn move
+        self.history: List[int] = [] # keys of the positions before each move played
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Position":
+        """Build a Position from a FEN string"""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"FEN needs at least 4 fields: {fen!r}")
+        placement, side, castling, ep_square = fields[:4]
+        halfmove = fields[4] if len(fields) > 4 else "0"
+        if not halfmove.isdigit():
+            raise ValueError(f"Invalid halfmove clock: {halfmove!r}")
+        rows = placement.split("/")
+        if len(rows) != 8:
+            raise ValueError(f"FEN board needs 8 rows: {placement!r}")
+
+        position = cls()
+        for row, text in enumerate(rows):
+            col = 0
+            for char in text:
+                if char.isdigit():
+                    col += int(char)
+                elif char in PIECE_SYMBOLS and col < 8:
+                    position.put_piece(square(row, col), PIECE_SYMBOLS.index(char))
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN row: {text!r}")
+            if col != 8:
+                raise ValueError(f"FEN row does not cover 8 squares: {text!r}")
+
+        for color in (0, 1):
+            if popcount(position.pieces[color * 6 + KING]) != 1:
+                raise ValueError(f"FEN needs exactly one {COLORS[color]} king: {placement!r}")
+        if side not in ("w", "b"):
+            raise ValueError(f"Invalid side to move: {side!r}")
+        position.side = 0 if side == "w" else 1
+        if castling != "-":
+            for char in castling:
+                if char not in FEN_CASTLING:
+                    raise ValueError(f"Invalid castling rights: {castling!r}")
+                position.castling |= FEN_CASTLING[char]
+            # A right needs its king and rook on their home squares, as in from_board()
+            for right, king_from, _, rook_from, _, _, _ in CASTLING_MOVES:
+                base = 0 if king_from == 60 else 6
+                if not (position.pieces[base + KING] >> king_from & 1
+                        and position.pieces[base + ROOK] >> rook_from & 1):
+                    position.castling &= ~right
+        if ep_square != "-":
+            ep = parse_square(ep_square)
+            # The square a pawn of the side not to move just skipped, with that pawn in front of it
+            them = position.side ^ 1
+            pushed = ep + 8 if them == 1 else ep - 8
+            if (ep // 8 != (2 if them == 1 else 5) or position.squares[ep] >= 0
+                    or position.squares[pushed] != them * 6 + PAWN):
+                raise ValueError(f"Invalid en passant square: {ep_square!r}")
+            # Kept only if a pawn can take there, as make_move() does
+            if PAWN_ATTACKS[them][ep] & position.pieces[position.side * 6 + PAWN]:
+                position.ep_square = ep
+        position.halfmove = int(halfmove)
+        position.key = compute_key(position)
+        return position
+
+    def to_fen(self, fullmove: int = 1) -> str:
+        """FEN string of the position; the fullmove number is not tracked and comes from the caller"""
+        rows = []
+        for row in range(8):
+            text = ""
+            empty = 0
+            for code in self.squares[row * 8:row * 8 + 8]:
+                if code < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += PIECE_SYMBOLS[code]
+            rows.append(text + str(empty) if empty else text)
+        castling = "".join(char for char, right in FEN_CASTLING.items() if self.castling & right)
+        ep_square = square_name(self.ep_square) if self.ep_square >= 0 else "-"
+        return (f"{'/'.join(rows)} {'wb'[self.side]} {castling or '-'} {ep_square} "
+                f"{self.halfmove} {fullmove}")
+
+    def pack(self) -> bytes:
+        """Fixed-size PACKED_SIZE-byte encoding of the position (see PACKED_SIZE)"""
+        occupied = self.occupancy[0] | self.occupancy[1]
+        nibbles = 0
+        shift = 0
+        for sq in iter_squares(occupied):
+            nibbles |= self.squares[sq] << shift
+            shift += 4
+        if shift > 128:
+            raise ValueError("Cannot pack a position with more than 32 pieces")
+        return (occupied.to_bytes(8, "little") + nibbles.to_bytes(16, "little")
+                + bytes((self.side | self.castling << 1, self.ep_square & 0xFF, min(self.halfmove, 255)))
+                + bytes(PACKED_SIZE - 27))
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "Position":
+        """Rebuild a Position from the bytes returned by pack()"""
+        if len(data) != PACKED_SIZE:
+            raise ValueError(f"Packed position must be {PACKED_SIZE} bytes, got {len(data)}")
+        position = cls()
+        nibbles = int.from_bytes(data[8:24], "little")
+        for sq in iter_squares(int.from_bytes(data[:8], "little")):
+            code = nibbles & 15
+            if code >= 12:
+                raise ValueError(f"Invalid piece code {code} in packed position")
+            position.put_piece(sq, code)
+            nibbles >>= 4
+        position.side = data[24] & 1
+        position.castling = data[24] >> 1 & 15
+        position.ep_square = data[25] if data[25] < 64 else -1
+        position.halfmove = data[26]
+        position.key = compute_key(position)
+        return position
+
+    @property
+    def turn(self) -> str:
+        return COLORS[self.side]
+
+    @property
+    def occupied(self) -> int:
+        return self.occupancy[0] | self.occupancy[1]
+
+    def copy(self) -> "Position":
+        position = Position.__new__(Position)
+        position.pieces = self.pieces[:]
+        position.occupancy = self.occupancy[:]
+        position.side = self.side
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.squares = self.squares[:]
+        position.piece_lists = (set(self.piece_lists[0]), set(self.piece_lists[1]))
+        position.king_squares = self.king_squares[:]
+        position.key = self.key
+        position.mg = self.mg
+        position.eg = self.eg
+        position.phase = self.phase
+        position.halfmove = self.halfmove
+        position.history = self.history[:]
+        return position
+
+    def piece_at(self, sq: int) -> Optional[int]:
+        """Piece code on a square, or None if it is empty"""
+        code = self.squares[sq]
+        return None if code < 0 else code
+
+    def put_piece(self, sq: int, code: int):
+        bit = 1 << sq
+        color = code // 6
+        self.pieces[code] |= bit
+        self.occupancy[color] |= bit
+        self.squares[sq] = code
+        self.piece_lists[color].add(sq)
+        self.key ^= ZOBRIST_PIECES[code][sq]
+        self.mg += MG_TABLE[code][sq]
+        self.eg += EG_TABLE[code][sq]
+        self.phase += PHASE[code]
+        if code % 6 == KING:
+            self.king_squares[color] = sq
+
+    def remove_piece(self, sq: int, code: int):
+        bit = ~(1 << sq)
+        color = code // 6
+        self.pieces[code] &= bit
+        self.occupancy[color] &= bit
+        self.squares[sq] = -1
+        self.piece_lists[color].discard(sq)
+        self.key ^= ZOBRIST_PIECES[code][sq]
+        self.mg -= MG_TABLE[code][sq]
+        self.eg -= EG_TABLE[code][sq]
+        self.phase -= PHASE[code]
+        if code % 6 == KING:
+            self.king_squares[color] = -1
+
+
+def create_piece(piece_type: str, color: str) -> Dict:
+    """Create a piece dictionary with type, color and moved status"""
+    return {"type": piece_type, "color": color, "has_moved": False}
+
+
+def create_board() -> List[List[Dict]]:
+    """Create the 8x8 list-of-dicts board in the starting position"""
+    board = [[None for _ in range(8)] for _ in range(8)]
+    piece_order = ["R", "N", "B", "Q", "K", "B", "N", "R"]
+    for col in range(8):
+        board[0][col] = create_piece(piece_order[col], BLACK)
+        board[1][col] = create_piece("P", BLACK)
+        board[6][col] = create_piece("P", WHITE)
+        board[7][col] = create_piece(piece_order[col], WHITE)
+    return board
+
+
+def from_board(board: List[List[Dict]], turn: str = WHITE) -> Position:
+    """Build a Position from an 8x8 list-of-dicts board"""
+    position = Position()
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece:
+                code = color_index(piece["color"]) * 6 + PIECE_TYPES.index(piece["type"])
+                position.put_piece(square(row, col), code)
+    position.side = color_index(turn)
+
+    # Castling rights come from kings and rooks that have not moved yet
+    for right, king_from, _, rook_from, _, _, _ in CASTLING_MOVES:
+        base = 0 if king_from == 60 else 6
+        king = board[king_from // 8][king_from % 8]
+        rook = board[rook_from // 8][rook_from % 8]
+        if (position.pieces[base + KING] >> king_from & 1 and not king["has_moved"]
+                and position.pieces[base + ROOK] >> rook_from & 1 and not rook["has_moved"]):
+            position.castling |= right
+    position.key = compute_key(position)
+    return position
+
+
+def compute_key(position: Position) -> int:
+    """Zobrist hash of a position computed from scratch"""
+    key = _state_key(position.castling, position.ep_square)
+    if position.side:
+        key ^= ZOBRIST_SIDE
+    for pieces in position.piece_lists:
+        for sq in pieces:
+            key ^= ZOBRIST_PIECES[position.squares[sq]][sq]
+    return key
+
+
+def to_board(position: Position) -> List[List[Dict]]:
+    """Build an 8x8 list-of-dicts board from a Position"""
+    board = [[None for _ in range(8)] for _ in range(8)]
+    for pieces in position.piece_lists:
+        for sq in pieces:
+            code = position.squares[sq]
+            row, col = square_coords(sq)
+            if code % 6 == PAWN:
+                has_moved = row != PAWN_START_ROW[code // 6]
+            else:
+                # Only kings and rooks have a has_moved flag that matters, for castling
+                has_moved = CASTLING_KEEP[sq] & position.castling == position.castling
+            board[row][col] = {"type": PIECE_TYPES[code % 6], "color": COLORS[code // 6],
+                               "has_moved": has_moved}
+    return board
+
+
+# A move is packed into an int, start | end << 6 | promotion piece type << 12, and
+# built and taken apart inline wherever it is used
+def move_name(move: int) -> str:
+    """Move in the 'e2 e4' input notation, with a promotion suffix like 'e7 e8q'"""
+    name = square_name(move & 63) + " " + square_name(move >> 6 & 63)
+    if move >> 12:
+        name += PIECE_SYMBOLS[6 + (move >> 12)]
+    return name
+
+
+def find_move(moves: List[int], start: int, end: int, promotion: int = QUEEN) -> Optional[int]:
+    """Pick the move from start to end out of a move list"""
+    for move in moves:
+        if move & 4095 == start | end << 6 and (not move >> 12 or move >> 12 == promotion):
+            return move
+    return None
+
+
+def pawn_pushes(sq: int, us: int, empty: int) -> int:
+    """Squares a pawn on sq can advance to"""
+    if us == 0:
+        single = (1 << sq >> 8) & empty
+        double = (single >> 8) & empty if sq // 8 == PAWN_START_ROW[0] else 0
+    else:
+        single = (1 << sq << 8) & empty
+        double = (single << 8) & empty if sq // 8 == PAWN_START_ROW[1] else 0
+    return single | double
+
+
+def castling_targets(position: Position, us: int) -> int:
+    """Squares the king of the given color can castle to"""
+    rights = position.castling & (3 if us == 0 else 12)
+    if not rights:
+        return 0
+    occupied = position.occupancy[0] | position.occupancy[1]
+    opponent_color = COLORS[us ^ 1]
+    targets = 0
+    for right, _, king_to, _, _, empty, safe in CASTLING_MOVES:
+        if not rights & right or any(occupied >> sq & 1 for sq in empty):
+            continue
+        if not any(square_attacked_by(position, sq, opponent_color) for sq in safe):
+            targets |= 1 << king_to
+    return targets
+
+
+def piece_targets(position: Position, sq: int) -> int:
+    """Squares the piece on sq may move to, ignoring checks"""
+    code = position.squares[sq]
+    if code < 0:
+        return 0
+    us, piece_type = divmod(code, 6)
+    own = position.occupancy[us]
+    occupied = position.occupancy[0] | position.occupancy[1]
+    if piece_type == PAWN:
+        targets = PAWN_ATTACKS[us][sq] & position.occupancy[us ^ 1]
+        if position.ep_square >= 0 and us == position.side:
+            targets |= PAWN_ATTACKS[us][sq] & 1 << position.ep_square
+        return targets | pawn_pushes(sq, us, ~occupied & BB_ALL)
+    if piece_type == KNIGHT:
+        attacks = KNIGHT_ATTACKS[sq]
+    elif piece_type == BISHOP:
+        attacks = bishop_attacks(sq, occupied)
+    elif piece_type == ROOK:
+        attacks = rook_attacks(sq, occupied)
+    elif piece_type == QUEEN:
+        attacks = rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+    else:
+        attacks = KING_ATTACKS[sq] | castling_targets(position, us)
+    return attacks & ~own
+
+
+# Rule functions whose calls and time RuleCounters measures
+TIMED_RULES = ("generate_legal_moves", "make_move", "unmake_move", "square_attacked_by",
+               "attackers_of", "is_in_check", "is_valid_move", "en_passant_is_legal")
+# Modules that import TIMED_RULES functions by name, where enable() rebinds them too;
+# chess.py is loaded as __main__ by python -m chess
+INSTRUMENTED_MODULES = ("chess_core", "__main__", "chess", "book", "chess_final", "packed", "perft",
+                        "pgn", "search", "server", "tablebase", "uci")
+
+
+class RuleCounters:
+    """Calls into the hot rule functions and the time spent in them, collected while enabled
+
+    enable() replaces each function in TIMED_RULES with a wrapper that counts
+    and times it, here and in the loaded INSTRUMENTED_MODULES, and disable()
+    puts the originals back, so disabled they cost nothing.
+    Times are inclusive, e.g. generate_legal_moves() includes its
+    square_attacked_by() calls. Counts are per process, so searches with
+    threads > 1 only report the main process.
+    """
+
+    __slots__ = ("enabled", "calls", "seconds", "valid_moves", "originals")
+
+    def __init__(self):
+        self.enabled = False
+        self.calls = dict.fromkeys(TIMED_RULES, 0)
+        self.seconds = dict.fromkeys(TIMED_RULES, 0.0)
+        self.valid_moves = [0] * 6   # is_valid_move calls by piece type
+        self.originals: Dict[str, object] = {}
+        self.reset()
+
+    def reset(self):
+        # Cleared in place: the wrappers of an enabled instance hold these dicts and list
+        for name in TIMED_RULES:
+            self.calls[name] = 0
+            self.seconds[name] = 0.0
+        self.valid_moves[:] = [0] * 6
+
+    def enable(self):
+        if self.enabled:
+            return
+        namespace = globals()
+        self.originals = {name: namespace[name] for name in TIMED_RULES}
+        timed = {name: self._timed(name, function) for name, function in self.originals.items()}
+        timed["is_valid_move"] = self._by_piece(timed["is_valid_move"])
+        _rebind(self.originals, timed)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        namespace = globals()
+        _rebind({name: namespace[name] for name in TIMED_RULES}, self.originals)
+        self.enabled = False
+
+    def _timed(self, name: str, function):
+        calls, seconds, clock = self.calls, self.seconds, time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds[name] += clock() - start
+                calls[name] += 1
+        timed.__name__ = timed.__qualname__ = function.__name__
+        timed.__doc__ = function.__doc__
+        return timed
+
+    def _by_piece(self, function):
+        """Wrap is_valid_move to also count its calls by the type of the piece moved"""
+        valid_moves = self.valid_moves
+
+        def counted(position, start, end):
+            piece = position.squares[start]
+            if piece >= 0:
+                valid_moves[piece % 6] += 1
+            return function(position, start, end)
+        counted.__name__ = counted.__qualname__ = function.__name__
+        counted.__doc__ = function.__doc__
+        return counted
+
+    def stats(self) -> dict:
+        return {
+            "calls": dict(self.calls),
+            "seconds": {name: round(seconds, 6) for name, seconds in self.seconds.items()},
+            "is_valid_move_by_piece": {PIECES[PIECE_TYPES[piece_type]]: count
+                                       for piece_type, count in enumerate(self.valid_moves)},
+            "trial_moves": self.calls["en_passant_is_legal"],
+        }
+
+
+def _rebind(old: Dict[str, object], new: Dict[str, object]):
+    """Point each loaded INSTRUMENTED_MODULES name bound to old[name] at new[name]"""
+    for module_name in INSTRUMENTED_MODULES:
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        namespace = vars(module)
+        for name, function in old.items():
+            if namespace.get(name) is function:
+                namespace[name] = new[name]
+
+
+COUNTERS = RuleCounters()
+
+
+def is_valid_move(position: Position, start: int, end: int) -> bool:
+    """Check if the piece on start may move to end, ignoring checks"""
+    if not 0 <= end < 64:
+        return False
+    return bool(piece_targets(position, start) >> end & 1)
+
+
+def attackers_of(position: Position, sq: int, color: str) -> int:
+    """Bitboard of the given color's pieces that attack a square
+
+    Looks outward from the square with each piece's pattern instead of asking
+    every enemy piece whether it can reach it.
+    """
+    them = color_index(color)
+    pieces = position.pieces
+    base = them * 6
+    occupied = position.occupancy[0] | position.occupancy[1]
+    return ((PAWN_ATTACKS[them ^ 1][sq] & pieces[base + PAWN])
+            | (KNIGHT_ATTACKS[sq] & pieces[base + KNIGHT])
+            | (KING_ATTACKS[sq] & pieces[base + KING])
+            | (bishop_attacks(sq, occupied) & (pieces[base + BISHOP] | pieces[base + QUEEN]))
+            | (rook_attacks(sq, occupied) & (pieces[base + ROOK] | pieces[base + QUEEN])))
+
+
+def square_attacked_by(position: Position, sq: int, color: str, occupied: Optional[int] = None) -> bool:
+    """Check if any piece of the given color attacks a square
+
+    Sliding attacks are computed against ``occupied`` when given, which lets
+    king moves be tested with the king itself lifted off the board.
+    """
+    them = color_index(color)
+    pieces = position.pieces
+    base = them * 6
+    if (KNIGHT_ATTACKS[sq] & pieces[base + KNIGHT]
+            or PAWN_ATTACKS[them ^ 1][sq] & pieces[base + PAWN]
+            or KING_ATTACKS[sq] & pieces[base + KING]):
+        return True
+    if occupied is None:
+        occupied = position.occupancy[0] | position.occupancy[1]
+    diagonal = pieces[base + BISHOP] | pieces[base + QUEEN]
+    if diagonal and bishop_attacks(sq, occupied) & diagonal:
+        return True
+    straight = pieces[base + ROOK] | pieces[base + QUEEN]
+    return bool(straight and rook_attacks(sq, occupied) & straight)
+
+
+def find_king(position: Position, color: str) -> int:
+    """Find the square of the king with given color, or -1"""
+    return position.king_squares[color_index(color)]
+
+
+def is_in_check(position: Position, color: str) -> bool:
+    """Check if given color's king is in check"""
+    king_sq = position.king_squares[color_index(color)]
+    if king_sq < 0:
+        return False
+    return square_attacked_by(position, king_sq, BLACK if color == WHITE else WHITE)
+
+
+def make_move(position: Position, move: int) -> Tuple[int, int, int, int]:
+    """Play a move in place and return an undo record for unmake_move
+
+    The undo record is (captured piece code or -1, previous castling rights,
+    previous en passant square, previous halfmove clock); castling rights
+    stand in for the has_moved flags of kings and rooks, and a pawn's
+    has_moved follows from its row. The key before the move is pushed onto
+    position.history.
+    """
+    start = move & 63
+    end = move >> 6 & 63
+    promotion = move >> 12
+    code = position.squares[start]
+    us, piece_type = divmod(code, 6)
+    undo = (-1, position.castling, position.ep_square, position.halfmove)
+    position.history.append(position.key)
+
+    captured = position.squares[end]
+    if captured >= 0:
+        position.remove_piece(end, captured)
+        undo = (captured, position.castling, position.ep_square, position.halfmove)
+    elif piece_type == PAWN and end == position.ep_square:
+        captured = (us ^ 1) * 6 + PAWN
+        position.remove_piece(end + 8 if us == 0 else end - 8, captured)
+        undo = (captured, position.castling, position.ep_square, position.halfmove)
+    # Captures and pawn moves cannot be undone, so no earlier position can recur
+    position.halfmove = 0 if captured >= 0 or piece_type == PAWN else position.halfmove + 1
+
+    position.remove_piece(start, code)
+    position.put_piece(end, code - piece_type + promotion if promotion else code)
+
+    if piece_type == KING and abs(end - start) == 2:
+        rook_from, rook_to = CASTLING_ROOK_SQUARES[end]
+        position.remove_piece(rook_from, us * 6 + ROOK)
+        position.put_piece(rook_to, us * 6 + ROOK)
+
+    state_key = _state_key(position.castling, position.ep_square)
+    position.castling &= CASTLING_KEEP[start] & CASTLING_KEEP[end]
+    # The en passant square is only kept (and hashed) when an enemy pawn can
+    # take on it, so a double push no one can answer does not split
+    # repetitions and transpositions from the same position reached otherwise
+    position.ep_square = -1
+    if piece_type == PAWN and abs(end - start) == 16:
+        ep_square = (start + end) // 2
+        if PAWN_ATTACKS[us][ep_square] & position.pieces[(us ^ 1) * 6 + PAWN]:
+            position.ep_square = ep_square
+    position.side ^= 1
+    position.key ^= state_key ^ _state_key(position.castling, position.ep_square) ^ ZOBRIST_SIDE
+    return undo
+
+
+def changed_squares(position: Position, move: int, undo: Tuple[int, int, int, int]) -> Tuple[int, ...]:
+    """Squares whose contents a move just played with make_move changed
+
+    That is the start and end squares, plus the rook's squares for castling
+    and the captured pawn's square for en passant, found from the undo record.
+    """
+    start = move & 63
+    end = move >> 6 & 63
+    code = position.squares[end]
+    if code % 6 == KING and abs(end - start) == 2:
+        return (start, end) + CASTLING_ROOK_SQUARES[end]
+    if code % 6 == PAWN and end == undo[2]:
+        return start, end, end + 8 if code < 6 else end - 8
+    return start, end
+
+
+def unmake_move(position: Position, move: int, undo: Tuple[int, int, int, int]):
+    """Take back a move played with make_move, restoring the position in place"""
+    start = move & 63
+    end = move >> 6 & 63
+    state_key = _state_key(position.castling, position.ep_square)
+    captured, position.castling, position.ep_square, position.halfmove = undo
+    position.history.pop()
+    position.side ^= 1
+    position.key ^= state_key ^ _state_key(position.castling, position.ep_square) ^ ZOBRIST_SIDE
+    us = position.side
+
+    code = position.squares[end]
+    position.remove_piece(end, code)
+    if move >> 12:
+        code = us * 6 + PAWN
+    position.put_piece(start, code)
+    piece_type = code - us * 6
+
+    if captured >= 0:
+        if piece_type == PAWN and end == position.ep_square:
+            position.put_piece(end + 8 if us == 0 else end - 8, captured)
+        else:
+            position.put_piece(end, captured)
+    elif piece_type == KING and abs(end - start) == 2:
+        rook_from, rook_to = CASTLING_ROOK_SQUARES[end]
+        position.remove_piece(rook_to, us * 6 + ROOK)
+        position.put_piece(rook_from, us * 6 + ROOK)
+
+
+def generate_moves(position: Position, color: str) -> List[int]:
+    """All moves for the given color that follow piece movement, ignoring checks"""
+    us = color_index(color)
+    moves = []
+    for start in position.piece_lists[us]:
+        targets = piece_targets(position, start)
+        if position.squares[start] == us * 6 + PAWN:
+            for end in iter_squares(targets):
+                if end // 8 == PROMOTION_ROW[us]:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        moves.append(start | end << 6 | promotion << 12)
+                else:
+                    moves.append(start | end << 6)
+        else:
+            for end in iter_squares(targets):
+                moves.append(start | end << 6)
+    return moves
+
+
+def pin_masks(position: Position, us: int, king_sq: int) -> Dict[int, int]:
+    """Map each pinned piece of the given color to the line it may still move along"""
+    them = us ^ 1
+    pieces = position.pieces
+    own = position.occupancy[us]
+    occupied = position.occupancy[0] | position.occupancy[1]
+    straight = pieces[them * 6 + ROOK] | pieces[them * 6 + QUEEN]
+    diagonal = pieces[them * 6 + BISHOP] | pieces[them * 6 + QUEEN]
+    pins = {}
+    for direction in range(8):
+        ray = RAYS[direction][king_sq]
+        if not ray & (straight if direction < 4 else diagonal):
+            continue
+        blockers = ray & occupied
+        if not blockers & own:
+            continue
+        if RAY_INCREASING[direction]:
+            first = (blockers & -blockers).bit_length() - 1
+            rest = blockers ^ (1 << first)
+            second = (rest & -rest).bit_length() - 1
+        else:
+            first = blockers.bit_length() - 1
+            rest = blockers ^ (1 << first)
+            second = rest.bit_length() - 1
+        if own >> first & 1 and rest and (straight if direction < 4 else diagonal) >> second & 1:
+            pins[first] = ray & ~RAYS[direction][second]
+    return pins
+
+
+def generate_legal_moves(position: Position, color: str) -> List[int]:
+    """All legal moves for the given color
+
+    Pinned pieces are held to their pin line and, when in check, other pieces
+    to the checker and the squares blocking it, so their moves are legal as
+    generated. Only king moves and en passant captures need an extra test.
+    """
+    us = color_index(color)
+    king_sq = position.king_squares[us]
+    if king_sq < 0:
+        return generate_moves(position, color)
+    opponent_color = COLORS[us ^ 1]
+    occupied = position.occupancy[0] | position.occupancy[1]
+    squares = position.squares
+    ep_bit = 1 << position.ep_square if position.ep_square >= 0 and us == position.side else 0
+
+    checkers = attackers_of(position, king_sq, opponent_color)
+    if not checkers:
+        check_mask = BB_ALL
+    elif checkers & (checkers - 1):
+        check_mask = 0  # double check: only the king may move
+    else:
+        checker_sq = checkers.bit_length() - 1
+        check_mask = checkers | BETWEEN[king_sq][checker_sq]
+    pins = pin_masks(position, us, king_sq)
+
+    moves = []
+    without_king = occupied & ~(1 << king_sq)
+    for end in iter_squares(piece_targets(position, king_sq)):
+        if not square_attacked_by(position, end, opponent_color, without_king):
+            moves.append(king_sq | end << 6)
+    if not check_mask:
+        return moves
+
+    pawn = us * 6 + PAWN
+    ep_moves = []
+    for start in position.piece_lists[us]:
+        if start == king_sq:
+            continue
+        targets = piece_targets(position, start)
+        mask = check_mask & pins[start] if start in pins else check_mask
+        if squares[start] != pawn:
+            for end in iter_squares(targets & mask):
+                moves.append(start | end << 6)
+            continue
+        for end in iter_squares(targets & mask & ~ep_bit):
+            if end // 8 == PROMOTION_ROW[us]:
+                for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                    moves.append(start | end << 6 | promotion << 12)
+            else:
+                moves.append(start | end << 6)
+        if targets & ep_bit:
+            ep_moves.append(start | position.ep_square << 6)
+
+    for move in ep_moves:
+        if en_passant_is_legal(position, move, color):
+            moves.append(move)
+    return moves
+
+
+def en_passant_is_legal(position: Position, move: int, color: str) -> bool:
+    """Whether an en passant capture leaves color's king safe
+
+    It removes two pieces from a line, so it is tested by playing it.
+    """
+    undo = make_move(position, move)
+    legal = not is_in_check(position, color)
+    unmake_move(position, move, undo)
+    return legal
+
+
+DEFAULT_MOVE_CACHE_SIZE = 4096
+
+
+class MoveCache:
+    """Bounded cache of legal move lists keyed by the position's Zobrist key
+
+    When full, "lru" drops the least recently used entry and "fifo" the
+    oldest one. Move lists are shared with the cache and must not be modified.
+    """
+
+    def __init__(self, size: int = DEFAULT_MOVE_CACHE_SIZE, policy: str = "lru"):
+        if policy not in ("lru", "fifo"):
+            raise ValueError(f"Unknown eviction policy: {policy!r}")
+        self.size = size
+        self.policy = policy
+        self._entries: "OrderedDict[Tuple[int, int], List[int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def legal_moves(self, position: Position, color: str) -> List[int]:
+        """generate_legal_moves(position, color), reused while the position is cached"""
+        key = (position.key, color_index(color))
+        moves = self._entries.get(key)
+        if moves is not None:
+            self.hits += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            return moves
+        self.misses += 1
+        moves = generate_legal_moves(position, color)
+        if self.size > 0:
+            if len(self._entries) >= self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = moves
+        return moves
+
+    def resize(self, size: int):
+        self.size = size
+        while len(self._entries) > max(size, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "entries": len(self._entries),
+            "policy": self.policy,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+        }
+
+
+# Shared by the front ends: parse_move, legal_moves, is_checkmate and is_stalemate
+MOVE_CACHE = MoveCache()
+
+
+def legal_moves(position: Position, color: Optional[str] = None) -> List[int]:
+    """Legal moves of color (default: the side to move) through the shared MOVE_CACHE"""
+    return MOVE_CACHE.legal_moves(position, position.turn if color is None else color)
+
+
+def is_checkmate(position: Position, color: str) -> bool:
+    """Check if the given color is in checkmate"""
+    return is_in_check(position, color) and not MOVE_CACHE.legal_moves(position, color)
+
+
+def is_stalemate(position: Position, color: str) -> bool:
+    """Check if the given color has no legal move while not in check"""
+    return not is_in_check(position, color) and not MOVE_CACHE.legal_moves(position, color)
+
+
+def repetitions(position: Position) -> int:
+    """Earlier occurrences of the current position in position.history
+
+    Only the last halfmove-clock entries can match, since a capture or pawn
+    move in between changes the position for good, and of those only every
+    second one has the same side to move; so the scan is at most 50 steps.
+    """
+    history = position.history
+    key = position.key
+    count = 0
+    for i in range(len(history) - 2, max(len(history) - position.halfmove, 0) - 1, -2):
+        if history[i] == key:
+            count += 1
+    return count
+
+
+def is_threefold_repetition(position: Position) -> bool:
+    """Check if the position has occurred three times"""
+    return repetitions(position) >= 2
+
+
+def is_fifty_move_draw(position: Position) -> bool:
+    """Check if fifty moves by each side passed without a capture or pawn move"""
+    return position.halfmove >= FIFTY_MOVE_PLIES
+
+
+def is_insufficient_material(position: Position) -> bool:
+    """Check if neither side can mate: bare kings, a single minor piece, or bishops all on one color"""
+    pieces = position.pieces
+    if any(pieces[base + piece_type] for base in (0, 6) for piece_type in (PAWN, ROOK, QUEEN)):
+        return False
+    knights = pieces[KNIGHT] | pieces[6 + KNIGHT]
+    bishops = pieces[BISHOP] | pieces[6 + BISHOP]
+    if popcount(knights | bishops) <= 1:
+        return True
+    return not knights and (not bishops & BB_LIGHT_SQUARES or not bishops & ~BB_LIGHT_SQUARES)
+
+
+def draw_reason(position: Position) -> Optional[str]:
+    """Why the game is drawn by rule, or None; checkmate and stalemate are checked separately"""
+    if is_threefold_repetition(position):
+        return "threefold repetition"
+    if is_fifty_move_draw(position):
+        return "fifty-move rule"
+    if is_insufficient_material(position):
+        return "insufficient material"
+    return None
+
+
+class IllegalMoveError(ValueError):
+    """Raised by parse_move for input that is not a legal move"""
+
+
+def parse_move(position: Position, text: str) -> int:
+    """Parse a move like 'e2 e4' or 'e7 e8n' into a legal move for the side to move
+
+    Raises IllegalMoveError with a message for the player when the input is
+    malformed or the move is not legal.
+    """
+    parts = text.lower().split()
+    if len(parts) != 2:
+        raise IllegalMoveError("Enter a move like 'e2 e4'")
+    start_str, end_str = parts
+    if end_str[2:] and end_str[2:] not in PROMOTION_SYMBOLS:
+        raise IllegalMoveError(f"Unknown promotion piece: {end_str[2:]!r}")
+    promotion = PROMOTION_SYMBOLS.get(end_str[2:], QUEEN)
+    try:
+        start = parse_square(start_str)
+        end = parse_square(end_str[:2])
+    except ValueError as e:
+        raise IllegalMoveError(str(e)) from None
+
+    piece = position.piece_at(start)
+    if piece is None:
+        raise IllegalMoveError("No piece at starting position")
+    if piece // 6 != position.side:
+        raise IllegalMoveError(f"It's {position.turn}'s turn")
+    move = find_move(MOVE_CACHE.legal_moves(position, position.turn), start, end, promotion)
+    if move is None:
+        if is_valid_move(position, start, end):
+            raise IllegalMoveError("Move would put/leave king in check")
+        raise IllegalMoveError("Invalid move for this piece")
+    return move
+
+
+def parse_san(position: Position, san: str) -> int:
+    """Parse a move in standard algebraic notation (e.g. 'Nbd7', 'exd8=Q+', 'O-O')
+
+    Raises IllegalMoveError if the text does not name exactly one legal move.
+    """
+    text = san.rstrip("+#!?")
+    moves = generate_legal_moves(position, position.turn)
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        king = position.king_squares[position.side]
+        move = find_move(moves, king, king + (2 if len(text) == 3 else -2))
+        if move is None:
+            raise IllegalMoveError(f"Illegal castling: {san}")
+        return move
+
+    promotion = 0
+    if "=" in text:
+        text, symbol = text.split("=", 1)
+        if symbol.lower() not in PROMOTION_SYMBOLS:
+            raise IllegalMoveError(f"Unknown promotion piece: {san}")
+        promotion = PROMOTION_SYMBOLS[symbol.lower()]
+    elif len(text) > 2 and text[-1] in "QRBN" and text[-2] in "18":
+        promotion = PROMOTION_SYMBOLS[text[-1].lower()]
+        text = text[:-1]
+
+    piece_type = PIECE_TYPES.index(text[0]) if text[:1] in ("N", "B", "R", "Q", "K") else PAWN
+    body = (text if piece_type == PAWN else text[1:]).replace("x", "").replace("-", "")
+    try:
+        end = parse_square(body[-2:])
+    except ValueError:
+        raise IllegalMoveError(f"Not a move: {san}") from None
+    hint = body[:-2]   # disambiguating file, rank or square of the moving piece
+
+    candidates = []
+    for move in moves:
+        start = move & 63
+        if move >> 6 & 63 != end or position.squares[start] % 6 != piece_type:
+            continue
+        if move >> 12 != (promotion or (QUEEN if move >> 12 else 0)):
+            continue
+        name = square_name(start)
+        if all(c == name[0] if c in "abcdefgh" else c == name[1] for c in hint):
+            candidates.append(move)
+    if len(candidates) != 1:
+        raise IllegalMoveError(f"{'Ambiguous' if candidates else 'Illegal'} move: {san}")
+    return candidates[0]
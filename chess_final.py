@@ -1,262 +1,371 @@
+"""Tk front end for the chess core.
+
+Nothing is built at import time; ``main()`` parses the command line, creates
+the window and runs the Tk event loop.
+
+Engine searches and the end-of-game checks after each move run on worker
+threads. Their results go through a queue that the Tk thread drains every
+FRAME_MS via ``root.after``, so the window keeps redrawing while the engine
+thinks. With pondering on, the engine searches the position after the reply
+it expects while the player thinks; if that reply is played the search
+carries on as the engine's move, otherwise it is stopped.
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
 import tkinter as tk
-from typing import List, Tuple, Dict
-from copy import deepcopy
-
-WHITE = "white"
-BLACK = "black"
-
-PIECES = {
-    "P": "pawn",
-    "R": "rook",
-    "N": "knight",
-    "B": "bishop",
-    "Q": "queen",
-    "K": "king"
-}
-
-def create_piece(piece_type: str, color: str) -> Dict:
-    return {"type": piece_type, "color": color, "has_moved": False}
-
-def create_board() -> List[List[Dict]]:
-    board = [[None for _ in range(8)] for _ in range(8)]
-    for col in range(8):
-        board[1][col] = create_piece("P", BLACK) 
-        board[6][col] = create_piece("P", WHITE)
-    piece_order = ["R", "N", "B", "Q", "K", "B", "N", "R"]
-    for col in range(8):
-        board[0][col] = create_piece(piece_order[col], BLACK)
-        board[7][col] = create_piece(piece_order[col], WHITE)
-    return board
-
-def parse_position(pos_str: str) -> Tuple[int, int]:  
-    col = ord(pos_str[0].lower()) - ord('a')
-    row = 8 - int(pos_str[1])
-    return (row, col)
-
-def print_board_to_gui(board, buttons):
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece:
-                symbol = piece["type"]
-                if piece["color"] == BLACK:
-                    symbol = symbol.lower() 
+import traceback
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from chess_core import (WHITE, BLACK, COLORS, PIECES, PIECE_TYPES, PIECE_SYMBOLS, IllegalMoveError,
+                        create_board, from_board, parse_move, make_move, changed_squares,
+                        is_checkmate, is_stalemate, draw_reason)
+from search import search, SearchResult, DEFAULT_TIME_LIMIT, MAX_DEPTH
+from tt import TranspositionTable, DEFAULT_HASH_MB
+from book import OpeningBook
+from instrument import SessionStats, add_arguments, instrumented
+
+# Interval at which worker results are collected; with the time a poll takes
+# this comes to about 60 polls per second
+FRAME_MS = 15
+# Seconds a thread may hold the interpreter lock while another waits for it
+# (Python's default is 5 ms); short enough that a search thread never delays
+# a frame noticeably
+SWITCH_INTERVAL = 0.001
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "imgs")
+SQUARE_PIXELS = 64
+
+# Piece code -> PhotoImage, plus a blank image under -1; shared by every button
+_piece_images: Dict[int, tk.PhotoImage] = {}
+
+
+def piece_images() -> Dict[int, tk.PhotoImage]:
+    """Piece images from imgs/, loaded and scaled once; needs a Tk root to exist"""
+    if not _piece_images:
+        for code in range(12):
+            name = f"{COLORS[code // 6]}_{PIECES[PIECE_TYPES[code % 6]]}.png"
+            image = tk.PhotoImage(file=os.path.join(IMAGE_DIR, name))
+            factor = max(image.width() // SQUARE_PIXELS, 1)
+            _piece_images[code] = image.subsample(factor) if factor > 1 else image
+        _piece_images[-1] = tk.PhotoImage(width=SQUARE_PIXELS, height=SQUARE_PIXELS)
+    return _piece_images
+
+
+class ChessGUI:
+    """The board window: an 8x8 grid of buttons, a move entry and a status line"""
+
+    def __init__(self, root: tk.Tk, engine_color: Optional[str] = None,
+                 think_time: float = DEFAULT_TIME_LIMIT, hash_mb: float = DEFAULT_HASH_MB,
+                 threads: int = 1, book_path: Optional[str] = None,
+                 stats: Optional[SessionStats] = None, ponder: bool = False):
+        self.root = root
+        self.engine_color = engine_color
+        self.think_time = think_time
+        self.threads = threads
+        self.tt = TranspositionTable(hash_mb) if engine_color else None
+        if self.tt is not None and threads > 1:
+            # Start the search processes from the Tk thread, not a search worker
+            from parallel import shared_searcher
+            shared_searcher(threads, self.tt.size_mb)
+        self.book = OpeningBook(book_path) if engine_color and book_path else None
+        self.stats = stats
+        if stats is not None:
+            stats.tt = self.tt
+        self.turn_start = time.perf_counter()    # when the side to move got the turn
+        # Multi-process searches share one pool and its stop event, so stopping a
+        # missed ponder search would cut the engine's own search short too
+        self.pondering = ponder and threads == 1
+        self.busy = engine_color == WHITE    # a move is being checked or the engine is on the move
+        self.thinking: Optional[EngineTask] = None    # search for the engine's move
+        self.ponder: Optional[EngineTask] = None      # search on the player's time
+        self.last_result: Optional[SearchResult] = None
+        self.results: "queue.Queue[tuple]" = queue.Queue()
+        self.workers = 0             # background jobs whose results are not collected yet
+        self.closed = False
+        self.last_frame = time.perf_counter()
+        self.longest_frame = 0.0     # longest gap between polls while a worker ran
+        self.position = from_board(create_board())
+        self.current_turn = WHITE
+        self.square_updates = 0    # button updates made by print_board_to_gui, reported by --stats
+        try:
+            self.images = piece_images()
+        except tk.TclError:
+            self.images = None     # no image support: fall back to piece letters
+
+        root.title("Chess")
+        frame = tk.Frame(root)
+        frame.grid(row=0, column=0)
+
+        self.buttons: List[List[tk.Button]] = [[None for _ in range(8)] for _ in range(8)]
+        for row in range(8):
+            for col in range(8):
+                if self.images:
+                    button = tk.Button(frame, image=self.images[-1], width=SQUARE_PIXELS,
+                                       height=SQUARE_PIXELS)
+                else:
+                    button = tk.Button(frame, width=4, height=2, font=("Arial", 14))
+                self.buttons[row][col] = button
+                self.buttons[row][col].grid(row=row + 1, column=col + 1)
+
+        for i in range(8):
+            tk.Label(frame, text=chr(ord('A') + i), font=("Arial", 12)).grid(row=0, column=i + 1)
+            tk.Label(frame, text=str(8 - i), font=("Arial", 12)).grid(row=i + 1, column=0)
+
+        tk.Label(frame, text=" ").grid(row=9, column=0)
+
+        move_frame = tk.Frame(root)
+        move_frame.grid(row=1, column=0)
+
+        tk.Label(move_frame, text="Enter your move: ").pack(side=tk.LEFT)
+
+        self.move_entry = tk.Entry(move_frame, width=10)
+        self.move_entry.pack(side=tk.LEFT)
+        self.move_entry.bind("<Return>", lambda event: self.on_move_input())
+
+        self.status_label = tk.Label(root, text=f"{self.current_turn.capitalize()}'s turn",
+                                     font=("Arial", 12))
+        self.status_label.grid(row=2, column=0)
+
+        tk.Button(move_frame, text="Submit", command=self.on_move_input).pack(side=tk.LEFT)
+
+        self.print_board_to_gui()
+        root.protocol("WM_DELETE_WINDOW", self.close)
+        root.after(FRAME_MS, self.poll_results)
+        if engine_color == WHITE:
+            root.after(100, self.play_engine_move)
+
+    def print_board_to_gui(self, squares: Optional[Sequence[int]] = None):
+        """Redraw the given squares, or the whole board when none are given"""
+        for sq in range(64) if squares is None else squares:
+            code = self.position.squares[sq]
+            button = self.buttons[sq // 8][sq % 8]
+            if self.images:
+                button.config(image=self.images[code])
             else:
-                symbol = ""
-            buttons[row][col].config(text=symbol)
-
-def is_valid_pawn_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]], piece: Dict) -> bool:
-    start_row, start_col = start
-    end_row, end_col = end
-    direction = -1 if piece["color"] == WHITE else 1
-    
-    if start_col == end_col:
-        if end_row == start_row + direction and not board[end_row][end_col]:
-            return True
-        if (not piece["has_moved"] and
-            end_row == start_row + 2 * direction and
-            not board[end_row][end_col] and
-            not board[start_row + direction][start_col]):
-            
-            return True
-    
-    elif (abs(start_col - end_col) == 1 and
-          end_row == start_row + direction and
-          board[end_row][end_col] and
-          board[end_row][end_col]["color"] != piece["color"]):
-        return True
-    
-    return False
-
-def is_valid_rook_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]]) -> bool:
-    start_row, start_col = start
-    end_row, end_col = end   
-    if start_row != end_row and start_col != end_col:
-        return False
-    row_step = 0 if start_row == end_row else (end_row - start_row) // abs(end_row - start_row)
-    col_step = 0 if start_col == end_col else (end_col - start_col) // abs(end_col - start_col)
-    
-    curr_row, curr_col = start_row + row_step, start_col + col_step
-    while (curr_row, curr_col) != (end_row, end_col):
-        if board[curr_row][curr_col]:
-            return False 
-        curr_row += row_step
-        curr_col += col_step
-    
-    return True
-
-def is_valid_knight_move(start: Tuple[int, int], end: Tuple[int, int]) -> bool:
-    row_diff = abs(end[0] - start[0])
-    col_diff = abs(end[1] - start[1])
-    return (row_diff == 2 and col_diff == 1) or (row_diff == 1 and col_diff == 2)
-
-def is_valid_bishop_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]]) -> bool:
-    start_row, start_col = start
-    end_row, end_col = end
-    if abs(end_row - start_row) != abs(end_col - start_col):
-        return False
-    row_step = (end_row - start_row) // abs(end_row - start_row)
-    col_step = (end_col - start_col) // abs(end_col - start_col)
-    
-    curr_row, curr_col = start_row + row_step, start_col + col_step
-    while (curr_row, curr_col) != (end_row, end_col):
-        if board[curr_row][curr_col]:
-            return False
-        curr_row += row_step
-        curr_col += col_step
-    
-    return True
-
-def is_valid_move(start: Tuple[int, int], end: Tuple[int, int], board: List[List[Dict]], piece: Dict) -> bool:
-    if not (0 <= end[0] < 8 and 0 <= end[1] < 8):
-        return False
-        
-    if board[end[0]][end[1]] and board[end[0]][end[1]]["color"] == piece["color"]:
-        return False
-        
-    piece_type = piece["type"]
-    
-    if piece_type == "P":
-        return is_valid_pawn_move(start, end, board, piece)
-    elif piece_type == "R": 
-        return is_valid_rook_move(start, end, board)
-    elif piece_type == "N":
-        return is_valid_knight_move(start, end)
-    elif piece_type == "B":
-        return is_valid_bishop_move(start, end, board)
-    elif piece_type == "Q":
-        return is_valid_rook_move(start, end, board) or is_valid_bishop_move(start, end, board)
-    elif piece_type == "K":
-        return abs(end[0] - start[0]) <= 1 and abs(end[1] - start[1]) <= 1
-    return False
-
-def find_king(board: List[List[Dict]], color: str) -> Tuple[int, int]:
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece["type"] == "K" and piece["color"] == color:
-                return (row, col)
-    return (-1, -1)
-
-def is_in_check(board: List[List[Dict]], color: str) -> bool:
-    king_pos = find_king(board, color)
-    opponent_color = BLACK if color == WHITE else WHITE
-
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece["color"] == opponent_color:
-                if is_valid_move((row, col), king_pos, board, piece):
-                    return True
-    return False
-
-def make_move(board, start, end):
-    piece = board[start[0]][start[1]]
-    board[end[0]][end[1]] = piece
-    board[start[0]][start[1]] = None
-    piece["has_moved"] = True
-
-def check_winner(board, current_turn):
-    opponent_color = BLACK if current_turn == WHITE else WHITE
-    king_pos = find_king(board, opponent_color)
-    if king_pos == (-1, -1):
-        return f"{current_turn.capitalize()} wins!"
-    return None
-
-def is_checkmate(board, color):
-    opponent_color = BLACK if color == WHITE else WHITE
-    king_pos = find_king(board, color)
-    if not is_in_check(board, color):
-        return False
-
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece["color"] == color:
-                for r in range(8):
-                    for c in range(8):
-                        if is_valid_move((row, col), (r, c), board, piece):
-                            test_board = deepcopy(board)
-                            make_move(test_board, (row, col), (r, c))
-                            if not is_in_check(test_board, color):
-                                return False
-    return True
-
-def on_move_input(board, buttons, current_turn, move_entry, status_label):  
-    move = move_entry.get().strip().lower()
-    move_entry.delete(0, tk.END)
-    if move == "quit":
-        root.destroy()
-        return 
-    try:
-        start_str, end_str = move.split()
-        start = parse_position(start_str)
-        end = parse_position(end_str)
-        piece = board[start[0]][start[1]]
-        if not piece or piece["color"] != current_turn[0]:
-            status_label.config(text="Invalid move: Wrong piece")
+                button.config(text=PIECE_SYMBOLS[code] if code >= 0 else "")
+            self.square_updates += 1
+        if self.stats is not None:
+            self.stats.extra["square_updates"] = self.square_updates
+
+    def on_move_input(self):
+        move = self.move_entry.get().strip().lower()
+        self.move_entry.delete(0, tk.END)
+        if move == "quit":
+            self.close()
             return
-        if not is_valid_move(start, end, board, piece):
-            status_label.config(text="Invalid move")
+        if self.busy:
+            self.status_label.config(text=f"Wait for {self.current_turn}'s move")
             return
-        test_board = deepcopy(board)
-        make_move(test_board, start, end)
-        if is_in_check(test_board, current_turn[0]):
-            status_label.config(text="Move leaves king in check")
+        try:
+            move = parse_move(self.position, move)
+        except IllegalMoveError as e:
+            self.status_label.config(text=str(e))
             return
-        make_move(board, start, end)
-        board[end[0]][end[1]]["has_moved"] = True
-        
-        opponent_color = BLACK if current_turn[0] == WHITE else WHITE
-        if is_checkmate(board, opponent_color):
-            status_label.config(text=f"{current_turn[0].capitalize()} wins by checkmate!")
-            for row in buttons:
-                for button in row:
-                    button.config(state=tk.DISABLED)
+        if self.stats is not None:
+            self.stats.record_move("player", time.perf_counter() - self.turn_start)
+        if self.ponder is not None:
+            if move == self.ponder.move:
+                self.ponder.hit = True
+            else:
+                self.ponder.stop.set()
+                self.ponder = None
+        undo = make_move(self.position, move)
+        self.finish_turn(move, undo)
+
+    def run_in_background(self, callback: Callable, function: Callable, *args, **kwargs):
+        """Run function(*args, **kwargs) on a worker thread; callback gets the result on the Tk thread
+
+        Results are queued and picked up by poll_results(), which Tk calls
+        every FRAME_MS, so the worker never touches a widget.
+        """
+        if self.stats is not None:
+            args = (function,) + args
+            function = self.stats.call
+        self.workers += 1
+
+        def work():
+            try:
+                self.results.put((callback, function(*args, **kwargs), None))
+            except Exception as e:
+                self.results.put((callback, None, e))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def poll_results(self):
+        now = time.perf_counter()
+        if self.workers and now - self.last_frame > self.longest_frame:
+            self.longest_frame = now - self.last_frame
+            if self.stats is not None:
+                self.stats.extra["longest_frame_ms"] = round(self.longest_frame * 1000, 1)
+        self.last_frame = now
+        while True:
+            try:
+                callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.workers -= 1
+            try:
+                if error is not None:
+                    raise error
+                callback(result)
+            except Exception as e:
+                # Polling must go on whatever failed, or no later result would arrive
+                self.report_error(e)
+        if not self.closed:
+            self.root.after(FRAME_MS, self.poll_results)
+
+    def report_error(self, error: Exception):
+        """Show an error from a background job on the status line, with the traceback on stderr"""
+        traceback.print_exception(type(error), error, error.__traceback__)
+        self.status_label.config(text=f"Error: {error}")
+
+    def finish_turn(self, move: int, undo: Tuple[int, int, int, int]):
+        """Redraw after a move, then check for the end of the game on a worker thread"""
+        self.print_board_to_gui(changed_squares(self.position, move, undo))
+        self.busy = True
+        self.run_in_background(self.on_game_state, game_state, self.position.copy(), self.current_turn)
+
+    def on_game_state(self, message: Optional[str]):
+        if message:
+            self.end_game(message)
             return
-        
-        current_turn[0] = BLACK if current_turn[0] == WHITE else WHITE
-        print_board_to_gui(board, buttons)   
-        status_label.config(text=f"{current_turn[0].capitalize()}'s turn")
-    except Exception as e:
-        status_label.config(text=f"Error: {e}")
-
-root = tk.Tk()
-root.title("Chess")
-
-board = create_board()
-current_turn = [WHITE]
-
-frame = tk.Frame(root)
-frame.grid(row=0, column=0)
-
-buttons = [[None for _ in range(8)] for _ in range(8)]
-for row in range(8):
-    for col in range(8):
-        buttons[row][col] = tk.Button(frame, width=4, height=2, font=("Arial", 14))
-        buttons[row][col].grid(row=row + 1, column=col + 1)
-
-for i in range(8):
-    tk.Label(frame, text=chr(ord('A') + i), font=("Arial", 12)).grid(row=0, column=i + 1)
-    tk.Label(frame, text=str(8 - i), font=("Arial", 12)).grid(row=i + 1, column=0)
-
-
-tk.Label(frame, text=" ").grid(row=9, column=0)
-
-move_frame = tk.Frame(root)
-move_frame.grid(row=1, column=0)
-
-move_label = tk.Label(move_frame, text="Enter your move: ")
-move_label.pack(side=tk.LEFT)
-
-move_entry = tk.Entry(move_frame, width=10)
-move_entry.pack(side=tk.LEFT)
-
-status_label = tk.Label(root, text=f"{current_turn[0].capitalize()}'s turn", font=("Arial", 12))
-status_label.grid(row=2, column=0)
-
-def on_submit():
-    on_move_input(board, buttons, current_turn, move_entry, status_label)
+        self.current_turn = BLACK if self.current_turn == WHITE else WHITE
+        self.status_label.config(text=f"{self.current_turn.capitalize()}'s turn")
+        self.turn_start = time.perf_counter()
+        self.busy = False
+        if self.current_turn == self.engine_color:
+            self.play_engine_move()
+        elif self.engine_color and self.pondering:
+            self.start_pondering()
+
+    def end_game(self, message: str):
+        self.stop_searches()
+        self.status_label.config(text=message)
+        for row in self.buttons:
+            for button in row:
+                button.config(state=tk.DISABLED)
+
+    def play_engine_move(self):
+        self.busy = True
+        self.status_label.config(text=f"{self.current_turn.capitalize()} is thinking...")
+        ponder, self.ponder = self.ponder, None
+        if ponder is not None and ponder.hit:
+            # The predicted move was played: the ponder search continues as this move's
+            # search, stopping think_time after it began
+            ponder.source = "ponder"
+            self.thinking = ponder
+            if ponder.result is not None:
+                self.on_engine_result(ponder, ponder.result)
+            else:
+                delay = ponder.start + self.think_time - time.perf_counter()
+                self.root.after(max(int(delay * 1000), 0), ponder.stop.set)
+            return
+        move = self.book.choose(self.position) if self.book else None
+        if move is not None:
+            # The last search's principal variation no longer predicts the reply
+            self.last_result = None
+            self.play_move(move, "book", 0)
+            return
+        self.thinking = EngineTask()
+        self.start_search(self.thinking, self.position.copy(), self.think_time)
 
-submit_button = tk.Button(move_frame, text="Submit", command=on_submit)
-submit_button.pack(side=tk.LEFT)
+    def start_pondering(self):
+        """Search the position after the predicted reply while the player thinks"""
+        pv = self.last_result.pv if self.last_result is not None else []
+        if len(pv) < 2:
+            return
+        position = self.position.copy()
+        make_move(position, pv[1])
+        self.ponder = EngineTask(pv[1])
+        self.start_search(self.ponder, position, None)
+
+    def start_search(self, task: "EngineTask", position, time_limit: Optional[float]):
+        kwargs = dict(time_limit=time_limit, tt=self.tt, threads=self.threads, stop_event=task.stop)
+        if time_limit is None:
+            kwargs.update(depth=MAX_DEPTH, nodes=None)    # until stopped
+        self.run_in_background(lambda result: self.on_engine_result(task, result),
+                               search, position, **kwargs)
+
+    def on_engine_result(self, task: "EngineTask", result: SearchResult):
+        if task is not self.thinking:
+            # A ponder search: kept for a hit that is still to come, dropped after a miss
+            task.result = result
+            return
+        self.thinking = None
+        self.last_result = result
+        self.play_move(result.move, task.source, result.nodes)
+
+    def play_move(self, move: int, source: str, nodes: int):
+        if self.stats is not None:
+            self.stats.record_move(source, time.perf_counter() - self.turn_start, nodes)
+        undo = make_move(self.position, move)
+        self.finish_turn(move, undo)
+
+    def stop_searches(self):
+        for task in (self.thinking, self.ponder):
+            if task is not None:
+                task.stop.set()
+        self.thinking = self.ponder = None
+
+    def close(self):
+        """Stop any search and close the window"""
+        self.stop_searches()
+        self.closed = True
+        self.root.destroy()
+
+
+class EngineTask:
+    """One background search: its stop event, and for pondering the predicted move"""
+
+    __slots__ = ("move", "stop", "start", "hit", "result", "source")
+
+    def __init__(self, move: Optional[int] = None):
+        self.move = move
+        self.stop = threading.Event()
+        self.start = time.perf_counter()
+        self.hit = False
+        self.result: Optional[SearchResult] = None
+        self.source = "engine"
+
+
+def game_state(position, mover: str) -> Optional[str]:
+    """End-of-game message after mover's move, or None if the game goes on"""
+    opponent_color = BLACK if mover == WHITE else WHITE
+    if is_checkmate(position, opponent_color):
+        return f"{mover.capitalize()} wins by checkmate!"
+    if is_stalemate(position, opponent_color):
+        return "Stalemate! The game is a draw"
+    reason = draw_reason(position)
+    return f"Draw by {reason}" if reason else None
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Play chess in a Tk window")
+    parser.add_argument("--engine", choices=[WHITE, BLACK], help="let the computer play this color")
+    parser.add_argument("--think", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="seconds the computer may think per move")
+    parser.add_argument("--hash", type=float, default=DEFAULT_HASH_MB,
+                        help="transposition table size in MB")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="search processes sharing the transposition table")
+    parser.add_argument("--book", help="opening book file the computer plays from before searching")
+    parser.add_argument("--ponder", action="store_true",
+                        help="let the computer think on your time about the reply it expects "
+                             "(single-threaded searches only)")
+    add_arguments(parser)
+    args, _ = parser.parse_known_args(argv)
+
+    if args.ponder and args.threads > 1:
+        print("--ponder is ignored with --threads above 1", file=sys.stderr)
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    with instrumented(args.stats, args.profile) as stats:
+        root = tk.Tk()
+        ChessGUI(root, args.engine, args.think, args.hash, args.threads, args.book, stats, args.ponder)
+        root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Session statistics and profiling for the front ends.
+
+``--stats [FILE]`` turns on the rule counters in chess_core (``COUNTERS``),
+which count and time calls to move generation, make/unmake and the attack
+and check tests, and when the session ends writes them as JSON with the shared
+move cache's hits and misses, the transposition table's counters, nodes
+searched and the time taken per move. Without a file the JSON goes to
+stderr, which keeps stdout clean for the UCI protocol.
+
+``--profile FILE`` runs the whole session under cProfile and writes the
+profile to FILE, to be read with ``python -m pstats FILE``. cProfile only
+follows the thread that enabled it, so work on other threads is profiled
+through ``SessionStats.call()`` and merged into the same file.
+
+Both are off by default; the timed functions are then the plain ones and
+nothing is recorded.
+"""
+import argparse
+import json
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from chess_core import COUNTERS, MOVE_CACHE
+
+
+class SessionStats:
+    """Per-move times and node counts, grouped by who chose the move"""
+
+    def __init__(self):
+        self.moves: Dict[str, dict] = {}
+        self.tt = None    # a TranspositionTable whose counters go in the report
+        self.extra: Dict[str, object] = {}    # front-end specific figures for the report
+        self.profiling = False
+        self.thread_profiles = []
+
+    def call(self, function, *args, **kwargs):
+        """Call function, under its own profiler when profiling; for use on worker threads"""
+        if not self.profiling:
+            return function(*args, **kwargs)
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(function, *args, **kwargs)
+        finally:
+            self.thread_profiles.append(profiler)
+
+    def record_move(self, source: str, seconds: float, nodes: int = 0):
+        """Record one move chosen by source ('player', 'engine' or 'book')"""
+        entry = self.moves.get(source)
+        if entry is None:
+            entry = self.moves[source] = {"moves": 0, "seconds": 0.0, "max_seconds": 0.0, "nodes": 0}
+        entry["moves"] += 1
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        entry["nodes"] += nodes
+
+    def report(self) -> dict:
+        moves = {}
+        for source, entry in self.moves.items():
+            moves[source] = dict(entry, seconds=round(entry["seconds"], 6),
+                                 max_seconds=round(entry["max_seconds"], 6),
+                                 mean_seconds=round(entry["seconds"] / entry["moves"], 6))
+        report = {
+            "counters": COUNTERS.stats(),
+            "move_cache": MOVE_CACHE.stats(),
+            "nodes": sum(entry["nodes"] for entry in self.moves.values()),
+            "moves": moves,
+        }
+        if self.tt is not None:
+            report["transposition_table"] = self.tt.stats()
+        report.update(self.extra)
+        return report
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add the --stats and --profile options to a front end's parser"""
+    parser.add_argument("--stats", nargs="?", const="-", metavar="FILE",
+                        help="write rule counters, cache hits and move times as JSON "
+                             "when the session ends (default: stderr)")
+    parser.add_argument("--profile", metavar="FILE", help="run under cProfile and write the profile to FILE")
+
+
+@contextmanager
+def instrumented(stats_path: Optional[str] = None, profile_path: Optional[str] = None) -> Iterator[SessionStats]:
+    """Collect statistics and/or a profile for the duration of the block"""
+    stats = SessionStats()
+    if stats_path:
+        COUNTERS.reset()
+        COUNTERS.enable()
+    profiler = None
+    if profile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        stats.profiling = True
+        profiler.enable()
+    try:
+        yield stats
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            import pstats
+            combined = pstats.Stats(profiler)
+            if stats.thread_profiles:
+                combined.add(*stats.thread_profiles)
+            combined.dump_stats(profile_path)
+        if stats_path:
+            COUNTERS.disable()
+            text = json.dumps(stats.report(), indent=2)
+            if stats_path == "-":
+                print(text, file=sys.stderr)
+            else:
+                with open(stats_path, "w") as f:
+                    f.write(text + "\n")
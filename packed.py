@@ -0,0 +1,173 @@
+"""Files of fixed-size packed positions.
+
+Each record is the PACKED_SIZE-byte encoding of ``Position.pack()``, so a file
+of N positions is exactly N * PACKED_SIZE bytes and record i starts at
+i * PACKED_SIZE. ``write_positions()``/``read_positions()`` stream records in
+pure Python; with NumPy installed, ``encode_positions()``/``decode_squares()``
+convert whole batches at once and ``load_packed()`` maps a file without
+reading it.
+
+Run ``python -m chess pack games.pgn positions.bin`` to store every position
+of a PGN file and report the encode and decode rates.
+"""
+import argparse
+import sys
+import time
+from typing import Iterable, Iterator, List
+
+from chess_core import (PACKED_SIZE, STARTING_FEN, Position, IllegalMoveError, compute_key, make_move,
+                        parse_san)
+
+try:
+    import numpy as np
+except ImportError:  # the vectorized functions need NumPy, the rest do not
+    np = None
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("This function requires NumPy (pip install numpy)")
+
+
+def write_positions(path: str, positions: Iterable[Position]) -> int:
+    """Write packed positions to a file; returns the number written"""
+    count = 0
+    with open(path, "wb") as f:
+        for position in positions:
+            f.write(position.pack())
+            count += 1
+    return count
+
+
+def read_positions(path: str) -> Iterator[Position]:
+    """Stream the positions of a packed file one record at a time"""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(PACKED_SIZE)
+            if not data:
+                return
+            yield Position.unpack(data)
+
+
+def encode_positions(positions: List[Position]) -> "np.ndarray":
+    """Pack a batch of positions into an (N, PACKED_SIZE) uint8 array"""
+    _require_numpy()
+    squares = np.array([position.squares for position in positions], dtype=np.int8).reshape(-1, 64)
+    count = len(squares)
+    occupied = squares >= 0
+    slots = np.cumsum(occupied, axis=1) - 1
+    if count and slots[:, -1].max() >= 32:
+        raise ValueError("Cannot pack a position with more than 32 pieces")
+
+    rows, cols = np.nonzero(occupied)
+    codes = np.zeros((count, 32), dtype=np.uint8)
+    codes[rows, slots[rows, cols]] = squares[rows, cols]
+
+    packed = np.zeros((count, PACKED_SIZE), dtype=np.uint8)
+    packed[:, :8] = np.packbits(occupied, axis=1, bitorder="little")
+    packed[:, 8:24] = codes[:, 0::2] | codes[:, 1::2] << 4
+    packed[:, 24:27] = np.array([(position.side | position.castling << 1, position.ep_square & 0xFF,
+                                  min(position.halfmove, 255)) for position in positions],
+                                dtype=np.uint8).reshape(-1, 3)
+    return packed
+
+
+def decode_squares(packed) -> "np.ndarray":
+    """Square arrays (N, 64) of piece codes, -1 for empty, from packed records"""
+    _require_numpy()
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_SIZE)
+    occupied = np.unpackbits(packed[:, :8], axis=1, bitorder="little").astype(bool)
+    if len(packed) and occupied.sum(axis=1).max() > 32:
+        raise ValueError("Packed position has more than 32 occupied squares")
+    codes = np.empty((len(packed), 32), dtype=np.int8)
+    codes[:, 0::2] = packed[:, 8:24] & 15
+    codes[:, 1::2] = packed[:, 8:24] >> 4
+    slots = np.clip(np.cumsum(occupied, axis=1) - 1, 0, 31)
+    return np.where(occupied, np.take_along_axis(codes, slots, axis=1), -1).astype(np.int8)
+
+
+def decode_positions(packed) -> List[Position]:
+    """Rebuild Position objects from an (N, PACKED_SIZE) array of records"""
+    squares = decode_squares(packed)
+    packed = np.asarray(packed, dtype=np.uint8).reshape(-1, PACKED_SIZE)
+    positions = []
+    for row, (flags, ep_square, halfmove) in zip(squares.tolist(), packed[:, 24:27].tolist()):
+        position = Position()
+        for sq, code in enumerate(row):
+            if code >= 0:
+                position.put_piece(sq, code)
+        position.side = flags & 1
+        position.castling = flags >> 1 & 15
+        position.ep_square = ep_square if ep_square < 64 else -1
+        position.halfmove = halfmove
+        position.key = compute_key(position)
+        positions.append(position)
+    return positions
+
+
+def save_packed(path: str, packed) -> None:
+    """Write an (N, PACKED_SIZE) array of records to a file"""
+    _require_numpy()
+    np.asarray(packed, dtype=np.uint8).tofile(path)
+
+
+def load_packed(path: str, mmap: bool = True) -> "np.ndarray":
+    """Load a packed file as an (N, PACKED_SIZE) array, memory-mapped by default"""
+    _require_numpy()
+    if mmap:
+        return np.memmap(path, dtype=np.uint8, mode="r").reshape(-1, PACKED_SIZE)
+    return np.fromfile(path, dtype=np.uint8).reshape(-1, PACKED_SIZE)
+
+
+def game_positions(games) -> Iterator[Position]:
+    """Every position reached in a stream of PGN games, stopping a game at an illegal move"""
+    for game in games:
+        position = Position.from_fen(game.headers.get("FEN", STARTING_FEN))
+        yield position.copy()
+        for san in game.moves:
+            try:
+                make_move(position, parse_san(position, san))
+            except IllegalMoveError:
+                break
+            yield position.copy()
+
+
+def main(argv: List[str] = None) -> int:
+    from pgn import open_games
+
+    parser = argparse.ArgumentParser(prog="python -m chess pack",
+                                     description="Store every position of a PGN file in packed form")
+    parser.add_argument("pgn", help="PGN file to read")
+    parser.add_argument("output", help="packed positions file to write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = write_positions(args.output, game_positions(open_games(args.pgn)))
+    seconds = time.perf_counter() - start
+    print(f"Wrote {count} positions ({count * PACKED_SIZE:,} bytes) in {seconds:.2f}s")
+
+    start = time.perf_counter()
+    decoded = sum(1 for _ in read_positions(args.output))
+    seconds = time.perf_counter() - start
+    print(f"Read back {decoded} positions in {seconds:.2f}s "
+          f"({decoded / max(seconds, 1e-9):,.0f} positions/sec)")
+
+    if np is not None:
+        positions = list(read_positions(args.output))
+        start = time.perf_counter()
+        packed = encode_positions(positions)
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        squares = decode_squares(load_packed(args.output))
+        decode_time = time.perf_counter() - start
+        if not (packed == load_packed(args.output)).all():
+            print("NumPy encoding differs from Position.pack()")
+            return 1
+        print(f"NumPy: encoded {len(packed)} in {encode_time:.3f}s, decoded {len(squares)} "
+              f"square arrays in {decode_time:.3f}s "
+              f"({len(squares) / max(decode_time, 1e-9):,.0f} positions/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Lazy-SMP parallel search over a process pool.
+
+Every worker process runs the normal iterative-deepening search on the same
+position, and all of them read and write one transposition table laid over a
+``multiprocessing.shared_memory`` block, so each worker's results prune the
+others' trees. Odd-numbered helpers start one ply deeper to spread the work.
+The main worker's result is used unless a helper completed a deeper
+iteration; helpers are stopped as soon as the main worker finishes.
+Workers are spawned, not forked, so a pool may be started from any thread.
+
+Run ``python parallel.py --threads 1 2 4 8`` to measure speedup versus core
+count on the bundled positions.
+"""
+import argparse
+import atexit
+import multiprocessing
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from chess_core import Position, STARTING_FEN, move_name
+from search import Searcher, SearchResult, MAX_DEPTH, DEFAULT_TIME_LIMIT
+from tt import TranspositionTable, DEFAULT_HASH_MB, table_bytes
+from tablebase import default_tablebases
+
+# Fixed middlegame positions used by the speedup benchmark
+BENCH_POSITIONS = [
+    STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+]
+
+# Workers are started fresh rather than forked: the pool is often created from
+# a search thread, and a child forked while another thread holds a lock (such
+# as the one on sys.stdin during a blocking read) deadlocks at startup
+_CONTEXT = multiprocessing.get_context("spawn")
+
+# Per-process state of a pool worker, set up by _init_worker
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(shm_name: str, hash_mb: float, stop_event):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _worker["tt"] = TranspositionTable(hash_mb, shm.buf)
+    _worker["stop"] = stop_event
+
+
+def _worker_search(position: Position, time_limit: Optional[float], depth: Optional[int],
+                   nodes: Optional[int], worker_id: int, age: int) -> SearchResult:
+    tt = _worker["tt"]
+    tt.age = age
+    searcher = Searcher(position, time_limit, nodes, tt, _worker["stop"], tablebases=default_tablebases())
+    return searcher.iterate(min(depth or MAX_DEPTH, MAX_DEPTH), start_depth=1 + worker_id % 2)
+
+
+class ParallelSearcher:
+    """A pool of search processes sharing one transposition table"""
+
+    def __init__(self, threads: int, hash_mb: float = DEFAULT_HASH_MB):
+        self.threads = threads
+        self.hash_mb = hash_mb
+        self.age = 0
+        self.shm = shared_memory.SharedMemory(create=True, size=table_bytes(hash_mb))
+        self.stop_event = _CONTEXT.Event()
+        self.pool = _CONTEXT.Pool(threads, initializer=_init_worker,
+                                    initargs=(self.shm.name, hash_mb, self.stop_event))
+
+    def search(self, position: Position, time_limit: Optional[float] = None,
+               depth: Optional[int] = None, nodes: Optional[int] = None,
+               stop_event=None) -> SearchResult:
+        """Search with every worker and return the deepest completed result"""
+        if time_limit is None and depth is None:
+            time_limit = DEFAULT_TIME_LIMIT
+        start = time.perf_counter()
+        self.age = (self.age + 1) & 0xFF
+        self.stop_event.clear()
+        jobs = [self.pool.apply_async(_worker_search,
+                                      (position, time_limit, depth, nodes, worker, self.age))
+                for worker in range(self.threads)]
+        while not jobs[0].ready():
+            jobs[0].wait(0.01)
+            if stop_event is not None and stop_event.is_set():
+                self.stop_event.set()
+        self.stop_event.set()
+        results = [job.get() for job in jobs]
+        best = results[0]
+        for result in results[1:]:
+            if result.depth > best.depth and result.move is not None:
+                best = result
+        return best._replace(nodes=sum(result.nodes for result in results),
+                             time=time.perf_counter() - start)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> "ParallelSearcher":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# The pool kept alive between calls to parallel_search and its (threads, hash_mb)
+_searcher: Optional[ParallelSearcher] = None
+_searcher_key: Optional[Tuple[int, float]] = None
+
+
+def _close_searcher():
+    global _searcher, _searcher_key
+    if _searcher is not None:
+        _searcher.close()
+    _searcher = _searcher_key = None
+
+
+def shared_searcher(threads: int, hash_mb: float = DEFAULT_HASH_MB) -> ParallelSearcher:
+    """The pool parallel_search uses for these settings, started now if need be
+
+    A different thread count or hash size closes the old pool and its shared
+    table first. Front ends call this when the settings change so the
+    workers start before the first search rather than during it.
+    """
+    global _searcher, _searcher_key
+    key = (threads, hash_mb)
+    if key != _searcher_key:
+        if _searcher is None:
+            atexit.register(_close_searcher)
+        _close_searcher()
+        _searcher = ParallelSearcher(threads, hash_mb)
+        _searcher_key = key
+    return _searcher
+
+
+def parallel_search(position: Position, threads: int, time_limit: Optional[float] = None,
+                    depth: Optional[int] = None, nodes: Optional[int] = None,
+                    hash_mb: float = DEFAULT_HASH_MB, stop_event=None) -> SearchResult:
+    """search() with threads > 1 on the pool from shared_searcher(), reused by later calls"""
+    return shared_searcher(threads, hash_mb).search(position, time_limit, depth, nodes, stop_event)
+
+
+def bench(thread_counts: List[int], depth: int, fens: List[str] = BENCH_POSITIONS,
+          hash_mb: float = DEFAULT_HASH_MB) -> List[Tuple[int, float, int]]:
+    """Time fixed-depth searches of the bench positions for each thread count"""
+    rows = []
+    for threads in thread_counts:
+        with ParallelSearcher(threads, hash_mb) as searcher:
+            # Spawned workers take a moment to start; keep that out of the timings
+            searcher.search(Position.from_fen(STARTING_FEN), depth=1)
+            total_time = 0.0
+            total_nodes = 0
+            for fen in fens:
+                result = searcher.search(Position.from_fen(fen), depth=depth)
+                total_time += result.time
+                total_nodes += result.nodes
+                print(f"  threads {threads}: {move_name(result.move)} depth {result.depth} "
+                      f"score {result.score} in {result.time:.2f}s")
+        rows.append((threads, total_time, total_nodes))
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure parallel search speedup")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4],
+                        help="worker counts to compare")
+    parser.add_argument("--depth", type=int, default=4, help="fixed search depth")
+    parser.add_argument("--hash", type=float, default=DEFAULT_HASH_MB,
+                        help="shared transposition table size in MB")
+    args = parser.parse_args(argv)
+
+    print(f"{multiprocessing.cpu_count()} cores available, {len(BENCH_POSITIONS)} positions "
+          f"to depth {args.depth}")
+    rows = bench(args.threads, args.depth, hash_mb=args.hash)
+    base_time = rows[0][1]
+    print(f"\n{'threads':>7} {'time (s)':>9} {'nodes':>10} {'nodes/sec':>10} {'speedup':>8}")
+    for threads, total_time, total_nodes in rows:
+        print(f"{threads:>7} {total_time:>9.2f} {total_nodes:>10} "
+              f"{total_nodes / max(total_time, 1e-9):>10.0f} {base_time / max(total_time, 1e-9):>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""perft move-generation benchmark and rules regression suite.
+
+Run through the CLI, e.g. ``python -m chess perft --depth 4`` or
+``python -m chess perft --suite``.
+"""
+import argparse
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from chess_core import (Position, STARTING_FEN, generate_legal_moves, make_move, unmake_move,
+                        move_name)
+
+# (name, FEN, node counts for depth 1, 2, ...) from the Chess Programming Wiki perft results
+PERFT_SUITE: List[Tuple[str, str, List[int]]] = [
+    ("start", STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 4 mirrored", "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+# Suite depth used when none is given, small enough to finish in seconds
+DEFAULT_SUITE_DEPTH = 3
+
+
+def perft(position: Position, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree to the given depth"""
+    moves = generate_legal_moves(position, position.turn)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        undo = make_move(position, move)
+        nodes += perft(position, depth - 1)
+        unmake_move(position, move, undo)
+    return nodes
+
+
+def divide(position: Position, depth: int) -> Dict[str, int]:
+    """Leaf node count below each root move"""
+    counts = {}
+    for move in generate_legal_moves(position, position.turn):
+        undo = make_move(position, move)
+        counts[move_name(move)] = perft(position, depth - 1)
+        unmake_move(position, move, undo)
+    return counts
+
+
+def timed_perft(position: Position, depth: int) -> Tuple[int, float]:
+    """Run perft and return (nodes, seconds)"""
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    return nodes, time.perf_counter() - start
+
+
+def format_rate(nodes: int, seconds: float) -> str:
+    return f"{nodes} nodes in {seconds:.2f}s ({nodes / max(seconds, 1e-9):,.0f} nodes/sec)"
+
+
+def run_suite(max_depth: int = DEFAULT_SUITE_DEPTH) -> bool:
+    """Run every suite position up to max_depth and report mismatches"""
+    total_nodes = 0
+    total_time = 0.0
+    passed = True
+    for name, fen, counts in PERFT_SUITE:
+        for depth, expected in enumerate(counts[:max_depth], start=1):
+            nodes, seconds = timed_perft(Position.from_fen(fen), depth)
+            total_nodes += nodes
+            total_time += seconds
+            status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+            print(f"{name:<20} depth {depth}: {format_rate(nodes, seconds)} {status}")
+            passed = passed and nodes == expected
+    print(f"\nTotal: {format_rate(total_nodes, total_time)}")
+    print("All positions match" if passed else "Some positions do NOT match")
+    return passed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess perft",
+                                     description="Count move-generation leaf nodes")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="search depth (suite: maximum depth, default %d)" % DEFAULT_SUITE_DEPTH)
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to count from")
+    parser.add_argument("--divide", action="store_true", help="print counts per root move")
+    parser.add_argument("--suite", action="store_true",
+                        help="run the bundled positions with known node counts")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        return 0 if run_suite(args.depth or DEFAULT_SUITE_DEPTH) else 1
+
+    depth = args.depth or 3
+    try:
+        position = Position.from_fen(args.fen)
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(position, depth)
+        for name, nodes in sorted(counts.items()):
+            print(f"{name}: {nodes}")
+        nodes = sum(counts.values())
+        print(f"\nMoves: {len(counts)}")
+    else:
+        nodes = perft(position, depth)
+    print(f"Perft depth {depth}: {format_rate(nodes, time.perf_counter() - start)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Streaming PGN reader and bulk game validator.
+
+``read_games()`` turns any iterable of lines into a generator of games, so a
+file of any size is read one game at a time in constant memory. The validator
+replays every game through the rules in chess_core and reports the first
+illegal move of each game with its game and ply numbers. With ``--processes``
+the file is split at game boundaries and the pieces are checked in a process
+pool.
+
+Run through the CLI, e.g. ``python -m chess validate games.pgn --processes 8``.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from chess_core import (Position, STARTING_FEN, IllegalMoveError, make_move, parse_san)
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+_TAG_RE = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# Comment and variation delimiters are tokens of their own
+_TOKEN_RE = re.compile(r"[{}();]|[^\s{}();]+")
+# Only digits followed by dots, so the zeros of 0-0 castling are left alone
+_MOVE_NUMBER_RE = re.compile(r"^\d+\.+")
+
+# Bytes of file per job in process-pool mode
+CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class Game(NamedTuple):
+    headers: Dict[str, str]
+    moves: List[str]      # SAN moves of the main line
+    result: str
+
+
+class GameError(NamedTuple):
+    game: int             # 1-based game number in the file
+    ply: int              # 1-based ply of the offending move
+    san: str
+    message: str
+
+
+def read_games(lines: Iterable[str]) -> Iterator[Game]:
+    """Yield the games in a stream of PGN lines one at a time
+
+    Comments, variations, NAGs and move numbers are dropped; a game ends at
+    its result token, or at the next tag section or the end of the input.
+    """
+    headers: Dict[str, str] = {}
+    moves: List[str] = []
+    comment = False
+    variation_depth = 0
+    for line in lines:
+        if not comment and line.startswith("%"):
+            continue
+        if not comment and line.startswith("["):
+            if moves:
+                yield Game(headers, moves, "*")
+                headers, moves = {}, []
+            match = _TAG_RE.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+            continue
+        for token in _TOKEN_RE.findall(line):
+            if comment:
+                comment = token != "}"
+            elif token == "{":
+                comment = True
+            elif token == ";":
+                break
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth or token.startswith("$"):
+                continue
+            elif token in RESULTS:
+                yield Game(headers, moves, token)
+                headers, moves = {}, []
+            else:
+                token = _MOVE_NUMBER_RE.sub("", token)
+                if token and not token.isdigit():
+                    moves.append(token)
+    if headers or moves:
+        yield Game(headers, moves, "*")
+
+
+def open_games(path: str) -> Iterator[Game]:
+    """Stream the games of a PGN file"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from read_games(f)
+
+
+def validate_game(game: Game, number: int = 1) -> Tuple[int, Optional[GameError]]:
+    """Replay a game and return (plies played, first illegal move or None)"""
+    fen = game.headers.get("FEN", STARTING_FEN)
+    try:
+        position = Position.from_fen(fen)
+    except ValueError as e:
+        return 0, GameError(number, 0, "", f"Bad FEN header: {e}")
+    for ply, san in enumerate(game.moves, start=1):
+        try:
+            make_move(position, parse_san(position, san))
+        except IllegalMoveError as e:
+            return ply - 1, GameError(number, ply, san, str(e))
+    return len(game.moves), None
+
+
+def validate_games(games: Iterable[Game], first_number: int = 1) -> Tuple[int, int, List[GameError]]:
+    """Validate a stream of games; returns (games, plies, errors)"""
+    count = plies = 0
+    errors = []
+    for count, game in enumerate(games, start=1):
+        played, error = validate_game(game, first_number + count - 1)
+        plies += played
+        if error is not None:
+            errors.append(error)
+    return count, plies, errors
+
+
+def _chunk_lines(path: str, start: int, end: int) -> Iterator[str]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if offset >= end:
+                break
+            offset += len(line)
+            yield line.decode("utf-8", "replace")
+
+
+def game_boundaries(path: str, chunk_bytes: int = CHUNK_BYTES) -> List[int]:
+    """Offsets of tag lines following a blank line, about chunk_bytes apart"""
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as f:
+        target = chunk_bytes
+        while target < size:
+            f.seek(target)
+            offset = target + len(f.readline())     # skip the partial line
+            previous_blank = False
+            for line in f:
+                if line.startswith(b"[") and previous_blank:
+                    break
+                previous_blank = not line.strip()
+                offset += len(line)
+            if offset >= size:
+                break
+            offsets.append(offset)
+            target = offset + chunk_bytes
+    return offsets + [size]
+
+
+def _validate_chunk(job: Tuple[str, int, int]) -> Tuple[int, int, List[GameError]]:
+    path, start, end = job
+    return validate_games(read_games(_chunk_lines(path, start, end)))
+
+
+def validate_file(path: str, processes: int = 1,
+                  chunk_bytes: int = CHUNK_BYTES) -> Tuple[int, int, List[GameError]]:
+    """Validate every game of a PGN file; returns (games, plies, errors)"""
+    if processes <= 1:
+        return validate_games(open_games(path))
+    offsets = game_boundaries(path, chunk_bytes)
+    jobs = [(path, start, end) for start, end in zip(offsets, offsets[1:])]
+    games = plies = 0
+    errors = []
+    with multiprocessing.Pool(processes) as pool:
+        # Chunks come back in file order, so local game numbers can be offset
+        for count, chunk_plies, chunk_errors in pool.imap(_validate_chunk, jobs):
+            errors.extend(error._replace(game=error.game + games) for error in chunk_errors)
+            games += count
+            plies += chunk_plies
+    return games, plies, errors
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess validate",
+                                     description="Replay PGN games and report illegal moves")
+    parser.add_argument("files", nargs="+", help="PGN files to check")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes (default 1: stream in this process)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1024 * 1024),
+                        help="MB of file per job in process-pool mode")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in args.files:
+        start = time.perf_counter()
+        games, plies, errors = validate_file(path, args.processes, int(args.chunk_mb * 1024 * 1024))
+        seconds = time.perf_counter() - start
+        for error in errors:
+            print(f"{path}: game {error.game}, ply {error.ply} ({error.san}): {error.message}")
+        print(f"{path}: {games} games, {plies} plies in {seconds:.2f}s "
+              f"({games / max(seconds, 1e-9):,.0f} games/sec), {len(errors)} with illegal moves")
+        failed = failed or bool(errors)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
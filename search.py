@@ -0,0 +1,317 @@
+"""Alpha-beta search used for the computer opponent.
+
+Negamax with iterative deepening, aspiration windows, a transposition table
+and a capture-only quiescence search over the incremental evaluation in
+evaluation.py. Moves are ordered by the hash move and the previous principal
+variation, MVV-LVA for captures, then killer and history heuristics for
+quiet moves.
+
+Nodes below the root that repeat an earlier position, reach the fifty-move
+limit or lack mating material score as draws. Endgame tablebases
+(tablebase.py) are probed at the root, where a covered position is answered
+from the tables without searching, and at every node with few enough
+pieces, which scores it exactly.
+"""
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from chess_core import (Position, PAWN, QUEEN, generate_legal_moves, make_move,
+                        unmake_move, is_in_check, repetitions, is_insufficient_material,
+                        FIFTY_MOVE_PLIES)
+from tt import TranspositionTable, DEFAULT_HASH_MB, EXACT, LOWER, UPPER
+from evaluation import evaluate
+from tablebase import Tablebases, MAX_PIECES, default_tablebases
+
+MATE_SCORE = 100000
+# Scores beyond this are mates; the distance to mate is MATE_SCORE minus the score
+MATE_BOUND = MATE_SCORE - 1000
+INFINITY = MATE_SCORE + 1
+
+MAX_DEPTH = 64
+DEFAULT_TIME_LIMIT = 1.0
+DEFAULT_NODE_BUDGET = 2_000_000
+ASPIRATION_WINDOW = 50
+# Limits are checked once every this many nodes, a few milliseconds of search
+CHECK_INTERVAL = 256
+
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+
+
+class SearchResult(NamedTuple):
+    move: Optional[int]   # best move, None if there is no legal move
+    score: int            # centipawns from the side to move's point of view
+    depth: int            # deepest completed iteration
+    pv: List[int]         # principal variation starting with move
+    nodes: int
+    time: float
+
+
+class SearchAborted(Exception):
+    """Raised inside the tree when the time or node budget runs out"""
+
+
+def is_capture(position: Position, move: int) -> bool:
+    end = move >> 6 & 63
+    return (position.squares[end] >= 0
+            or (end == position.ep_square and position.squares[move & 63] % 6 == PAWN))
+
+
+def score_to_tt(score: int, ply: int) -> int:
+    """Store mate scores as distance from the stored node rather than the root"""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Searcher:
+    """State for one search: limits, counters and move-ordering tables"""
+
+    def __init__(self, position: Position, time_limit: Optional[float] = None,
+                 node_limit: Optional[int] = None, tt: Optional[TranspositionTable] = None,
+                 stop_event=None, info: Optional[Callable[[SearchResult], None]] = None,
+                 tablebases: Optional[Tablebases] = None):
+        self.position = position
+        self.stop_event = stop_event    # any object with is_set(), polled with the limits
+        self.info = info                # called with the result of each completed iteration
+        self.tt = tt if tt is not None else TranspositionTable()
+        # Probed below the root only when it holds at least one table
+        self.tablebases = tablebases if tablebases is not None and tablebases.tables else None
+        self.deadline = time.perf_counter() + time_limit if time_limit else None
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.abortable = False          # the first iteration always completes
+        self.killers = [[0, 0] for _ in range(MAX_DEPTH + 1)]
+        self.history = [[0] * 64 for _ in range(12)]
+        self.pv_table = [[] for _ in range(MAX_DEPTH + 2)]
+        self.previous_pv: List[int] = []
+
+    def check_limits(self):
+        if not self.abortable:
+            return
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchAborted
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchAborted
+
+    def order_moves(self, moves: List[int], ply: int, hash_move: int = 0) -> List[int]:
+        position = self.position
+        squares = position.squares
+        pv_move = self.previous_pv[ply] if ply < len(self.previous_pv) else 0
+        killers = self.killers[ply]
+        history = self.history
+
+        def score(move: int) -> int:
+            if move == hash_move:
+                return 1 << 31
+            if move == pv_move:
+                return 1 << 30
+            start = move & 63
+            end = move >> 6 & 63
+            attacker = squares[start]
+            victim = squares[end]
+            if victim >= 0 or move >> 12:
+                # MVV-LVA: most valuable victim first, least valuable attacker breaks ties
+                victim_value = PIECE_VALUES[victim % 6] if victim >= 0 else 0
+                promotion_value = PIECE_VALUES[move >> 12] if move >> 12 else 0
+                return (1 << 28) + (victim_value + promotion_value) * 8 - attacker % 6
+            if end == position.ep_square and attacker % 6 == PAWN:
+                return (1 << 28) + PIECE_VALUES[PAWN] * 8
+            if move == killers[0]:
+                return 1 << 27
+            if move == killers[1]:
+                return (1 << 27) - 1
+            return history[attacker][end]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def quiesce(self, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self.check_limits()
+        position = self.position
+        moves = generate_legal_moves(position, position.turn)
+        if not moves:
+            return -MATE_SCORE + ply if is_in_check(position, position.turn) else 0
+
+        stand_pat = evaluate(position)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        if ply >= MAX_DEPTH:
+            return alpha
+
+        captures = [move for move in moves if move >> 12 == QUEEN or is_capture(position, move)]
+        for move in self.order_moves(captures, ply):
+            undo = make_move(position, move)
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            unmake_move(position, move, undo)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.pv_table[ply] = []
+        position = self.position
+        # Below the root one repetition is scored as a draw: the side able to repeat can do it again
+        if ply and (position.halfmove >= FIFTY_MOVE_PLIES or repetitions(position)):
+            return 0
+        piece_count = len(position.piece_lists[0]) + len(position.piece_lists[1])
+        if ply and piece_count <= 4 and is_insufficient_material(position):
+            return 0
+        if ply and self.tablebases is not None and piece_count <= MAX_PIECES:
+            entry = self.tablebases.probe(position)
+            if entry is not None:
+                result, plies = entry
+                return result * (MATE_SCORE - ply - plies)
+        if depth <= 0:
+            return self.quiesce(alpha, beta, ply)
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self.check_limits()
+
+        key = position.key
+        hash_move = 0
+        entry = self.tt.probe(key)
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move = entry
+            if ply and entry_depth >= depth:
+                entry_score = score_from_tt(entry_score, ply)
+                if (bound == EXACT or (bound == LOWER and entry_score >= beta)
+                        or (bound == UPPER and entry_score <= alpha)):
+                    return entry_score
+
+        moves = generate_legal_moves(position, position.turn)
+        if not moves:
+            return -MATE_SCORE + ply if is_in_check(position, position.turn) else 0
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = 0
+        for move in self.order_moves(moves, ply, hash_move):
+            undo = make_move(position, move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            unmake_move(position, move, undo)
+            if score > best:
+                best = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+            if alpha >= beta:
+                if not is_capture(position, move) and not move >> 12:
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[position.squares[move & 63]][move >> 6 & 63] += depth * depth
+                break
+
+        if best >= beta:
+            bound = LOWER
+        elif best <= original_alpha:
+            bound = UPPER
+            best_move = 0
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, score_to_tt(best, ply), bound, best_move)
+        return best
+
+    def search_root(self, depth: int, alpha: int, beta: int) -> int:
+        return self.negamax(depth, alpha, beta, 0)
+
+    def iterate(self, max_depth: int, start_depth: int = 1) -> SearchResult:
+        """Iterative deepening with aspiration windows around the last score"""
+        start_time = time.perf_counter()
+        position = self.position
+        moves = generate_legal_moves(position, position.turn)
+        if not moves:
+            score = -MATE_SCORE if is_in_check(position, position.turn) else 0
+            return SearchResult(None, score, 0, [], 0, 0.0)
+
+        result = SearchResult(moves[0], 0, 0, [moves[0]], 0, 0.0)
+        score = 0
+        for depth in range(min(start_depth, max_depth), max_depth + 1):
+            try:
+                if depth >= 3:
+                    alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+                    score = self.search_root(depth, alpha, beta)
+                    if score <= alpha or score >= beta:
+                        score = self.search_root(depth, -INFINITY, INFINITY)
+                else:
+                    score = self.search_root(depth, -INFINITY, INFINITY)
+            except SearchAborted:
+                break
+            finally:
+                self.abortable = True
+            pv = self.pv_table[0] or result.pv
+            self.previous_pv = pv
+            result = SearchResult(pv[0], score, depth, pv, self.nodes,
+                                  time.perf_counter() - start_time)
+            if self.info is not None:
+                self.info(result)
+            if abs(score) >= MATE_BOUND:
+                break
+        return result._replace(nodes=self.nodes, time=time.perf_counter() - start_time)
+
+
+def search(position: Position, time_limit: Optional[float] = None, depth: Optional[int] = None,
+           nodes: Optional[int] = DEFAULT_NODE_BUDGET,
+           tt: Optional[TranspositionTable] = None, threads: int = 1,
+           stop_event=None, info: Optional[Callable[[SearchResult], None]] = None,
+           tablebases: Optional[Tablebases] = None) -> SearchResult:
+    """Find the best move for the side to move
+
+    Searches until depth is reached, time_limit seconds pass or the node
+    budget is spent, whichever comes first, and returns the result of the
+    deepest completed iteration. With no depth or time limit given the
+    search gets DEFAULT_TIME_LIMIT seconds. The search runs on a copy, so an
+    aborted iteration never leaves moves played on the caller's position.
+    Pass a long-lived ``tt`` to keep results between moves; otherwise a fresh
+    table of the default size is used. With threads > 1 the search runs in
+    worker processes sharing one table (see parallel.py), and ``tt`` only
+    supplies the table size. Setting ``stop_event`` ends the search early.
+    ``info`` is called with the result of every completed iteration (only
+    with the final result when threads > 1). ``tablebases`` defaults to the
+    tables in tablebase.DEFAULT_DIRECTORY; a position they cover is answered
+    at depth 0 without searching.
+    """
+    if time_limit is None and depth is None:
+        time_limit = DEFAULT_TIME_LIMIT
+    if tablebases is None:
+        tablebases = default_tablebases()
+    if tablebases.tables:
+        start_time = time.perf_counter()
+        best = tablebases.best_move(position)
+        if best is not None:
+            move, result, plies = best
+            result = SearchResult(move, result * (MATE_SCORE - plies), 0, [move], 0,
+                                  time.perf_counter() - start_time)
+            if info is not None:
+                info(result)
+            return result
+    if threads > 1:
+        from parallel import parallel_search
+        hash_mb = tt.size_mb if tt is not None else DEFAULT_HASH_MB
+        result = parallel_search(position, threads, time_limit, depth, nodes, hash_mb, stop_event)
+        if info is not None:
+            info(result)
+        return result
+    if tt is not None:
+        tt.new_search()
+    searcher = Searcher(position.copy(), time_limit, nodes, tt, stop_event, info, tablebases)
+    return searcher.iterate(min(depth or MAX_DEPTH, MAX_DEPTH))
@@ -0,0 +1,350 @@
+"""Asyncio TCP server hosting many games at once.
+
+The protocol is line-based text. A connecting player is paired with the
+player waiting in the lobby, or waits for the next one; the first to arrive
+plays white. Each game holds one ``Position``.
+
+Server to client:
+    start <game id> <white|black>
+    board <FEN>                     after the start and after every move
+    moved <white|black> <move>      sent to both players before the board
+    error <message>                 the last line sent was not accepted
+    end <1-0|0-1|1/2-1/2> <reason>  checkmate, stalemate, repetition, fifty-move,
+                                    insufficient-material, resign or disconnect;
+                                    the server then closes the connection
+
+Client to server:
+    e2 e4 / e7 e8n                  a move, in the same syntax as the other front ends
+    resign
+
+Run ``python -m chess serve --port 8765`` to host games, or
+``python -m chess serve --bench --games 2000`` to play that many concurrent
+games against a local client and report per-game memory and per-move latency.
+"""
+import argparse
+import asyncio
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+from chess_core import (Position, STARTING_FEN, COLORS, IllegalMoveError, parse_move, make_move,
+                        move_name, is_checkmate, is_stalemate, draw_reason, MOVE_CACHE)
+from instrument import SessionStats, add_arguments, instrumented
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Output a peer may leave unread before it is dropped; far more than a game's worth of lines
+MAX_UNSENT_BYTES = 64 * 1024
+
+# Reason words sent with "end" for draws by rule, from draw_reason()
+DRAW_REASONS = {"threefold repetition": "repetition", "fifty-move rule": "fifty-move",
+                "insufficient material": "insufficient-material"}
+
+# Legal, non-repeating opening line played by the benchmark clients
+BENCH_MOVES = ["e2 e4", "e7 e5", "g1 f3", "b8 c6", "f1 c4", "g8 f6", "d2 d3", "f8 c5",
+               "c2 c3", "d7 d6", "b1 d2", "a7 a6"]
+
+
+class Player:
+    __slots__ = ("writer", "game", "color")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.game: Optional["Game"] = None
+        self.color = 0
+
+
+class Game:
+    """One game in progress: its position and the two players"""
+
+    __slots__ = ("game_id", "position", "players", "plies")
+
+    def __init__(self, game_id: int, white: Optional[Player] = None, black: Optional[Player] = None):
+        self.game_id = game_id
+        self.position = Position.from_fen(STARTING_FEN)
+        self.players = [white, black]
+        self.plies = 0
+
+
+async def send(player: Player, line: str):
+    """Reply to the player whose lines are being handled, waiting while its socket is full"""
+    player.writer.write(line.encode() + b"\n")
+    await player.writer.drain()
+
+
+def deliver(player: Optional[Player], line: str):
+    """Queue a line for a game member without waiting for it to be read
+
+    Lines for both players of a game are sent from one player's handler, so
+    a slow or vanished peer must not hold up or end that handler. A peer that
+    leaves more than MAX_UNSENT_BYTES unread is disconnected; its own handler
+    then sees the closed connection and ends its game.
+    """
+    if player is None or player.writer.is_closing():
+        return
+    player.writer.write(line.encode() + b"\n")
+    if player.writer.transport.get_write_buffer_size() > MAX_UNSENT_BYTES:
+        player.writer.close()
+
+
+class GameServer:
+    """Pairs connections into games and relays validated moves"""
+
+    def __init__(self, stats: Optional[SessionStats] = None):
+        self.stats = stats       # records the server's time to handle each move
+        self.games: Dict[int, Game] = {}
+        self.waiting: Optional[Player] = None
+        self.next_id = 1
+        self.moves = 0
+        self.sessions = set()    # handler tasks of connected players
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_client, host, port, limit=4096)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        player = Player(writer)
+        task = asyncio.current_task()
+        self.sessions.add(task)
+        try:
+            await self.pair(player)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self.handle_line(player, line.decode(errors="replace").strip())
+        except ConnectionError:
+            pass
+        finally:
+            self.disconnect(player)
+            writer.close()
+            self.sessions.discard(task)
+
+    async def pair(self, player: Player):
+        opponent = self.waiting
+        if opponent is None:
+            self.waiting = player
+            return
+        self.waiting = None
+        game = Game(self.next_id, opponent, player)
+        self.next_id += 1
+        self.games[game.game_id] = game
+        for color, member in enumerate(game.players):
+            member.game = game
+            member.color = color
+            deliver(member, f"start {game.game_id} {COLORS[color]}")
+            deliver(member, f"board {game.position.to_fen()}")
+        await player.writer.drain()
+
+    async def handle_line(self, player: Player, line: str):
+        game = player.game
+        if not line:
+            return
+        if game is None:
+            await send(player, "error Waiting for an opponent")
+            return
+        if line.lower() == "resign":
+            self.finish(game, "0-1" if player.color == 0 else "1-0", "resign")
+            return
+        position = game.position
+        if position.side != player.color:
+            await send(player, "error Not your turn")
+            return
+        start = time.perf_counter()
+        try:
+            move = parse_move(position, line)
+        except IllegalMoveError as e:
+            await send(player, f"error {e}")
+            return
+        make_move(position, move)
+        game.plies += 1
+        self.moves += 1
+        fen = position.to_fen(fullmove=1 + game.plies // 2)
+        if self.stats is not None:
+            self.stats.record_move("player", time.perf_counter() - start)
+        for member in game.players:
+            deliver(member, f"moved {COLORS[player.color]} {move_name(move)}")
+            deliver(member, f"board {fen}")
+
+        if is_checkmate(position, position.turn):
+            self.finish(game, "1-0" if player.color == 0 else "0-1", "checkmate")
+        elif is_stalemate(position, position.turn):
+            self.finish(game, "1/2-1/2", "stalemate")
+        else:
+            reason = draw_reason(position)
+            if reason:
+                self.finish(game, "1/2-1/2", DRAW_REASONS[reason])
+        await player.writer.drain()
+
+    def finish(self, game: Game, result: str, reason: str):
+        """End a game and close both connections; players reconnect for another game"""
+        self.games.pop(game.game_id, None)
+        for member in game.players:
+            if member is not None:
+                member.game = None
+                deliver(member, f"end {result} {reason}")
+                # Queued lines are still sent; the member's handler then reads end of file
+                member.writer.close()
+
+    def disconnect(self, player: Player):
+        if self.waiting is player:
+            self.waiting = None
+        game = player.game
+        if game is not None:
+            game.players[player.color] = None
+            self.finish(game, "0-1" if player.color == 0 else "1-0", "disconnect")
+
+
+class GameClient:
+    """Minimal client for tests and benchmarks"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> "GameClient":
+        reader, writer = await asyncio.open_connection(host, port, limit=4096)
+        return cls(reader, writer)
+
+    async def send(self, line: str):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+
+    async def expect(self, *prefixes: str) -> str:
+        """Read lines until one starts with one of the prefixes and return it"""
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("Server closed the connection")
+            line = line.decode().strip()
+            if line.startswith(prefixes):
+                return line
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def measure_game_memory(count: int = 1000) -> float:
+    """Bytes allocated per Game object, position included"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [Game(game_id) for game_id in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return (after - before) / count
+
+
+async def _bench_player(client: GameClient, plies: int, think: float, latencies: List[float]):
+    color = COLORS.index((await client.expect("start")).split()[2])
+    await client.expect("board")
+    for ply, move in enumerate(BENCH_MOVES[:plies]):
+        if ply % 2 == color:
+            if think:
+                await asyncio.sleep(random.uniform(0, think))
+            start = time.perf_counter()
+            await client.send(move)
+            await client.expect("board", "error")
+            latencies.append(time.perf_counter() - start)
+        else:
+            await client.expect("board")
+
+
+async def bench(games: int, plies: int, think: float = 0.0,
+                stats: Optional[SessionStats] = None) -> Tuple[float, List[float], float]:
+    """Play games concurrently over loopback; returns (per-game bytes, latencies, seconds)"""
+    server = GameServer(stats)
+    tcp_server = await server.start(DEFAULT_HOST, 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    clients = []
+    for _ in range(games * 2):
+        clients.append(await GameClient.connect(DEFAULT_HOST, port))
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_bench_player(client, plies, think, latencies) for client in clients))
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{len(server.games)} games in progress, {server.moves} moves played")
+
+    for client in clients:
+        client.writer.close()
+    await asyncio.gather(*server.sessions)
+    tcp_server.close()
+    await tcp_server.wait_closed()
+    # ru_maxrss is in kilobytes on Linux; this counts both ends of every connection
+    return (rss_after - rss_before) * 1024 / games, latencies, seconds
+
+
+def _raise_file_limit(needed: int) -> int:
+    """Raise the open-file limit towards needed; returns the new limit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        soft = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess serve", description="Host chess games over TCP")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--move-cache", type=int, default=MOVE_CACHE.size,
+                        help="positions kept in the legal-move cache")
+    parser.add_argument("--bench", action="store_true",
+                        help="play concurrent games against a local client and report costs")
+    parser.add_argument("--games", type=int, default=1000, help="concurrent games for --bench")
+    parser.add_argument("--plies", type=int, default=len(BENCH_MOVES),
+                        help="plies per benchmark game (at most %d)" % len(BENCH_MOVES))
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="benchmark players wait up to this many seconds before each move")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    MOVE_CACHE.resize(args.move_cache)
+    with instrumented(args.stats, args.profile) as stats:
+        return run(parser, args, stats)
+
+
+def run(parser: argparse.ArgumentParser, args: argparse.Namespace, stats: SessionStats) -> int:
+    if not args.bench:
+        async def serve():
+            tcp_server = await GameServer(stats).start(args.host, args.port)
+            print(f"Serving games on {args.host}:{args.port}")
+            async with tcp_server:
+                await tcp_server.serve_forever()
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    # Each game has two connections, with a socket at both ends of each
+    needed = args.games * 4 + 64
+    limit = _raise_file_limit(needed)
+    if limit < needed:
+        parser.error(f"{args.games} games need {needed} open files but the limit is {limit}")
+    print(f"Game object: {measure_game_memory():,.0f} bytes per game")
+    session_bytes, latencies, seconds = asyncio.run(bench(args.games, min(args.plies, len(BENCH_MOVES)),
+                                                           args.think, stats))
+    latencies.sort()
+    print(f"{args.games} concurrent games, {len(latencies)} moves in {seconds:.2f}s "
+          f"({len(latencies) / max(seconds, 1e-9):,.0f} moves/sec)")
+    print(f"Process memory: {session_bytes:,.0f} bytes per game, both ends of both connections included")
+    if latencies:
+        def percentile(p):
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000
+        print(f"Move latency: median {percentile(0.5):.2f} ms, 95th {percentile(0.95):.2f} ms, "
+              f"99th {percentile(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    cache = MOVE_CACHE.stats()
+    print(f"Move cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%}), "
+          f"{cache['evictions']} evictions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
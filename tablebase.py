@@ -0,0 +1,324 @@
+"""Endgame tablebases for king and one piece against a bare king.
+
+Each table covers one material set (KQK, KRK or KPK) with the extra piece
+on white's side; positions where black has it are probed with the board
+mirrored and colors swapped. A position is indexed as
+``side << 18 | white king << 12 | black king << 6 | piece`` and the table
+holds one byte per index: 0 for a draw, ILLEGAL for an impossible position,
+otherwise the number of plies to mate plus one. Only the side with the piece
+can win, so whether the byte is a win or a loss follows from the side to
+move.
+
+Tables are built by retrograde analysis. Checkmates, found with
+chess_core's ``is_checkmate()``, are the positions lost in 0 plies. Working
+outwards one ply at a time, a position with the piece's side to move is won
+as soon as one move reaches a lost position, and a position with the bare
+king to move is lost once every one of its moves reaches a won position,
+which is tracked with a per-position count of moves not yet known to lose.
+KPK is seeded from KQK and KRK through promotions, so those are built first.
+
+Tables are saved as raw bytes and memory-mapped by ``Tablebases``, which
+``search()`` probes at the root and at every node with three pieces left.
+
+Run ``python -m chess tablebase build`` to generate the tables into
+tablebases/ and ``python -m chess tablebase probe --fen FEN`` to look up a
+position.
+"""
+import argparse
+import mmap
+import os
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from chess_core import (Position, PAWN, ROOK, QUEEN, KING, BLACK, KING_ATTACKS, PAWN_ATTACKS,
+                        rook_attacks, bishop_attacks, compute_key, is_checkmate, popcount,
+                        iter_squares, generate_legal_moves, make_move, unmake_move, move_name)
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+
+# Material sets in build order: KPK promotes into the other two
+MATERIAL = {"KQK": QUEEN, "KRK": ROOK, "KPK": PAWN}
+TABLE_SIZE = 2 * 64 * 64 * 64
+ILLEGAL = 255
+DRAW = 0
+# Most pieces on the board in a position the tables can answer
+MAX_PIECES = 3
+
+WIN, LOSS = 1, -1
+
+
+def _index(side: int, white_king: int, black_king: int, piece: int) -> int:
+    return side << 18 | white_king << 12 | black_king << 6 | piece
+
+
+def _attacks(piece_type: int, sq: int, occupied: int) -> int:
+    """Squares white's extra piece on sq attacks"""
+    if piece_type == QUEEN:
+        return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+    if piece_type == ROOK:
+        return rook_attacks(sq, occupied)
+    return PAWN_ATTACKS[0][sq]
+
+
+def _position(side: int, white_king: int, black_king: int, piece_type: int, piece: int) -> Position:
+    position = Position()
+    position.put_piece(white_king, KING)
+    position.put_piece(black_king, 6 + KING)
+    position.put_piece(piece, piece_type)
+    position.side = side
+    position.key = compute_key(position)
+    return position
+
+
+def build_table(name: str, tables: Dict[str, "array"] = None) -> "array":
+    """Build the table for one material set; KPK needs KQK and KRK in tables"""
+    piece_type = MATERIAL[name]
+    values = array("B", bytes(TABLE_SIZE))
+    # Black king moves not yet known to lose, for each black-to-move position
+    pending = array("B", bytes(TABLE_SIZE // 2))
+    levels: List[List[int]] = [[]]
+
+    for white_king in range(64):
+        for black_king in range(64):
+            kings_apart = (white_king != black_king and not KING_ATTACKS[white_king] >> black_king & 1)
+            for piece in range(64):
+                white_index = _index(0, white_king, black_king, piece)
+                black_index = white_index | 1 << 18
+                if (not kings_apart or piece in (white_king, black_king)
+                        or (piece_type == PAWN and piece // 8 in (0, 7))):
+                    values[white_index] = values[black_index] = ILLEGAL
+                    continue
+                occupied = 1 << white_king | 1 << black_king | 1 << piece
+                # With white to move, black must not be in check
+                if _attacks(piece_type, piece, occupied) >> black_king & 1:
+                    values[white_index] = ILLEGAL
+                # The black king may take the piece unless the white king guards it
+                guarded = KING_ATTACKS[white_king] | _attacks(piece_type, piece, occupied & ~(1 << black_king))
+                moves = popcount(KING_ATTACKS[black_king] & ~guarded & ~(1 << white_king))
+                pending[black_index - TABLE_SIZE // 2] = moves
+                if not moves and is_checkmate(_position(1, white_king, black_king, piece_type, piece), BLACK):
+                    levels[0].append(black_index)
+
+    if piece_type == PAWN:
+        # Promotions lead into the KQK and KRK tables with black to move
+        for index in range(TABLE_SIZE // 2):
+            piece = index & 63
+            if values[index] == ILLEGAL or piece // 8 != 1:
+                continue
+            target = piece - 8
+            if target in (index >> 12 & 63, index >> 6 & 63):
+                continue
+            for promoted in ("KQK", "KRK"):
+                value = tables[promoted][_index(1, index >> 12 & 63, index >> 6 & 63, target)]
+                if value not in (DRAW, ILLEGAL):
+                    while len(levels) <= value:
+                        levels.append([])
+                    levels[value].append(index)
+
+    level = 0
+    while any(levels[level:]):
+        if len(levels) == level + 1:
+            levels.append([])
+        for index in levels[level]:
+            if values[index]:
+                continue
+            values[index] = level + 1
+            white_king = index >> 12 & 63
+            black_king = index >> 6 & 63
+            piece = index & 63
+            occupied = 1 << white_king | 1 << black_king | 1 << piece
+            empty = ~occupied
+            if index >> 18:
+                # Black is lost here: every white move into this position wins
+                base = index & ~(1 << 18)
+                for sq in iter_squares(KING_ATTACKS[white_king] & empty):
+                    before = base & ~(63 << 12) | sq << 12
+                    if not values[before]:
+                        levels[level + 1].append(before)
+                if piece_type == PAWN:
+                    froms = []
+                    if piece // 8 < 6 and empty >> (piece + 8) & 1:
+                        froms.append(piece + 8)
+                        if piece // 8 == 4 and empty >> (piece + 16) & 1:
+                            froms.append(piece + 16)
+                else:
+                    froms = iter_squares(_attacks(piece_type, piece, occupied) & empty)
+                for sq in froms:
+                    before = base & ~63 | sq
+                    if not values[before]:
+                        levels[level + 1].append(before)
+            else:
+                # White wins here: black positions moving into it lose one more move
+                base = index | 1 << 18
+                for sq in iter_squares(KING_ATTACKS[black_king] & empty & ~KING_ATTACKS[white_king]):
+                    before = base & ~(63 << 6) | sq << 6
+                    if values[before]:
+                        continue
+                    offset = before - TABLE_SIZE // 2
+                    pending[offset] -= 1
+                    if not pending[offset]:
+                        levels[level + 1].append(before)
+        levels[level] = []
+        level += 1
+    return values
+
+
+def save_table(values: "array", path: str):
+    with open(path, "wb") as f:
+        values.tofile(f)
+
+
+def load_table(path: str) -> mmap.mmap:
+    """Memory-map a saved table read-only"""
+    with open(path, "rb") as f:
+        table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(table) != TABLE_SIZE:
+        table.close()
+        raise ValueError(f"{path} is not a tablebase file")
+    return table
+
+
+def table_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.bin")
+
+
+def build_tables(directory: str = DEFAULT_DIRECTORY, names: List[str] = None):
+    """Build and save tables, loading or building the ones KPK depends on"""
+    os.makedirs(directory, exist_ok=True)
+    names = names or list(MATERIAL)
+    tables = {}
+    for name in MATERIAL:
+        path = table_path(directory, name)
+        if name not in names and not (name != "KPK" and "KPK" in names):
+            continue
+        if name not in names and os.path.exists(path):
+            tables[name] = load_table(path)
+            continue
+        start = time.perf_counter()
+        values = build_table(name, tables)
+        save_table(values, path)
+        tables[name] = values
+        wins = sum(1 for value in values[:TABLE_SIZE // 2] if value not in (DRAW, ILLEGAL))
+        longest = max(value for value in values if value != ILLEGAL) - 1
+        print(f"{name}: {wins} wins with white to move, longest mate {longest} plies, "
+              f"{time.perf_counter() - start:.1f}s -> {path}")
+
+
+class Tablebases:
+    """Memory-mapped tables found in a directory; missing tables are skipped"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        self.tables: Dict[int, mmap.mmap] = {}
+        for name, piece_type in MATERIAL.items():
+            path = table_path(directory, name)
+            if os.path.exists(path):
+                self.tables[piece_type] = load_table(path)
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+        self.tables.clear()
+
+    def probe(self, position: Position) -> Optional[Tuple[int, int]]:
+        """(WIN, LOSS or 0 for a draw, plies to mate) for the side to move, None if not covered"""
+        pieces = [sq for sq in position.piece_lists[0] | position.piece_lists[1]
+                  if position.squares[sq] % 6 != KING]
+        if len(pieces) > 1 or len(position.piece_lists[0]) + len(position.piece_lists[1]) > MAX_PIECES:
+            return None
+        kings = position.king_squares
+        if -1 in kings:
+            return None
+        if not pieces:
+            return 0, 0
+        sq = pieces[0]
+        color, piece_type = divmod(position.squares[sq], 6)
+        table = self.tables.get(piece_type)
+        if table is None:
+            # A lone bishop or knight cannot mate
+            return (0, 0) if piece_type not in MATERIAL.values() else None
+        if position.castling:
+            return None
+        if color == 0:
+            value = table[_index(position.side, kings[0], kings[1], sq)]
+        else:
+            value = table[_index(position.side ^ 1, kings[1] ^ 56, kings[0] ^ 56, sq ^ 56)]
+        if value == ILLEGAL:
+            return None
+        if value == DRAW:
+            return 0, 0
+        return (WIN if position.side == color else LOSS), value - 1
+
+    def best_move(self, position: Position) -> Optional[Tuple[int, int, int]]:
+        """(move, result, plies) of the best move by the tables, None if not covered
+
+        Wins take the shortest mate and losses the longest; result and plies
+        are for the side to move, as from probe().
+        """
+        if self.probe(position) is None:
+            return None
+        best = None
+        for move in generate_legal_moves(position, position.turn):
+            undo = make_move(position, move)
+            reply = self.probe(position)
+            unmake_move(position, move, undo)
+            if reply is None:
+                return None
+            result, plies = -reply[0], reply[1] + 1
+            rank = result * (1000 - plies)
+            if best is None or rank > best[0]:
+                best = (rank, move, result, plies)
+        return best[1:] if best else None
+
+
+_default: Optional[Tablebases] = None
+
+
+def default_tablebases() -> Tablebases:
+    """The tables in DEFAULT_DIRECTORY, loaded on first use"""
+    global _default
+    if _default is None:
+        _default = Tablebases()
+    return _default
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess tablebase",
+                                     description="Build or probe KQK, KRK and KPK endgame tables")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="generate tables by retrograde analysis")
+    build.add_argument("names", nargs="*", metavar="NAME",
+                       help="tables to build: %s (default: all)" % ", ".join(MATERIAL))
+    build.add_argument("--dir", default=DEFAULT_DIRECTORY, help="directory for the table files")
+    probe = subparsers.add_parser("probe", help="look up a position")
+    probe.add_argument("--fen", required=True)
+    probe.add_argument("--dir", default=DEFAULT_DIRECTORY, help="directory with the table files")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        unknown = [name for name in args.names if name not in MATERIAL]
+        if unknown:
+            parser.error(f"Unknown tables: {', '.join(unknown)}")
+        build_tables(args.dir, args.names)
+        return 0
+
+    try:
+        position = Position.from_fen(args.fen)
+    except ValueError as e:
+        parser.error(str(e))
+    tablebases = Tablebases(args.dir)
+    entry = tablebases.probe(position)
+    if entry is None:
+        print("Not covered by the available tables")
+        return 1
+    result, plies = entry
+    print({WIN: f"Win, mate in {plies} plies", LOSS: f"Loss, mated in {plies} plies"}.get(result, "Draw"))
+    best = tablebases.best_move(position)
+    if best is not None:
+        print(f"Best move: {move_name(best[0])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
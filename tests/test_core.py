@@ -0,0 +1,202 @@
+"""Rules regression checks: perft counts, incremental state and serialisation"""
+import ast
+import os
+import random
+
+import pytest
+
+import chess_core
+from chess_core import (COUNTERS, MoveCache, Position, STARTING_FEN, compute_key, generate_legal_moves,
+                        is_threefold_repetition, make_move, parse_move, parse_square, repetitions,
+                        unmake_move)
+from evaluation import compute_scores
+from perft import PERFT_SUITE, perft
+
+# Deep enough to cover castling, en passant and promotion in the suite, still quick
+PERFT_DEPTH = 3
+
+
+def random_game(plies: int, seed: int):
+    """Yield a position after each move of a random game, restarting when it ends"""
+    rng = random.Random(seed)
+    position = Position.from_fen(STARTING_FEN)
+    for _ in range(plies):
+        moves = generate_legal_moves(position, position.turn)
+        if not moves:
+            position = Position.from_fen(STARTING_FEN)
+            continue
+        make_move(position, rng.choice(moves))
+        yield position
+
+
+@pytest.mark.parametrize("name, fen, counts", PERFT_SUITE, ids=[entry[0] for entry in PERFT_SUITE])
+def test_perft_suite(name, fen, counts):
+    for depth, expected in enumerate(counts[:PERFT_DEPTH], start=1):
+        assert perft(Position.from_fen(fen), depth) == expected, f"{name} depth {depth}"
+
+
+def test_incremental_scores_match_recomputation():
+    for position in random_game(400, seed=1):
+        for move in generate_legal_moves(position, position.turn):
+            undo = make_move(position, move)
+            assert (position.mg, position.eg, position.phase) == compute_scores(position)
+            unmake_move(position, move, undo)
+
+
+def test_key_after_make_and_unmake():
+    for position in random_game(400, seed=2):
+        key = position.key
+        assert key == compute_key(position)
+        for move in generate_legal_moves(position, position.turn):
+            undo = make_move(position, move)
+            assert position.key == compute_key(position)
+            unmake_move(position, move, undo)
+            assert position.key == key
+
+
+@pytest.mark.parametrize("fen", [entry[1] for entry in PERFT_SUITE], ids=[entry[0] for entry in PERFT_SUITE])
+def test_fen_and_pack_round_trip(fen):
+    position = Position.from_fen(fen)
+    assert position.to_fen(fullmove=int(fen.split()[5])) == fen
+    unpacked = Position.unpack(position.pack())
+    assert unpacked.to_fen() == position.to_fen()
+    assert unpacked.key == position.key
+
+
+def play(position: Position, moves: str) -> Position:
+    for text in moves.split(","):
+        make_move(position, parse_move(position, text.strip()))
+    return position
+
+
+def test_repetition_after_double_push():
+    # The knights return to the position after e2e4, which no black pawn could take en passant
+    position = play(Position.from_fen(STARTING_FEN),
+                    "e2 e4, g8 f6, g1 f3, f6 g8, f3 g1, g8 f6, g1 f3, f6 g8, f3 g1")
+    assert repetitions(position) == 2
+    assert is_threefold_repetition(position)
+
+
+def test_transposition_through_double_push():
+    first = play(Position.from_fen(STARTING_FEN), "e2 e4, e7 e6, d2 d4")
+    second = play(Position.from_fen(STARTING_FEN), "d2 d4, e7 e6, e2 e4")
+    assert first.key == second.key
+    assert first.to_fen() == second.to_fen()
+
+
+def test_en_passant_square_kept_when_capturable():
+    position = play(Position.from_fen(STARTING_FEN), "e2 e4, a7 a6, e4 e5, d7 d5")
+    assert position.to_fen().split()[3] == "d6"
+    assert position.key == compute_key(position)
+
+
+def test_fen_castling_rights_need_king_and_rook_at_home():
+    position = Position.from_fen("4k3/8/8/8/8/8/8/4K3 w K - 0 1")
+    assert position.castling == 0
+    assert position.to_fen().split()[2] == "-"
+
+
+@pytest.mark.parametrize("fen", ["8/8/8/8/8/8/8/4K3 w - - 0 1", "4k3/8/8/8/8/8/8/3KK3 w - - 0 1"])
+def test_fen_needs_one_king_per_side(fen):
+    with pytest.raises(ValueError):
+        Position.from_fen(fen)
+
+
+@pytest.mark.parametrize("fen", [
+    "4k3/8/8/8/8/8/3P4/4K3 w - e3 0 1",         # wrong rank for white to move
+    "4k3/8/8/3pP3/8/8/8/4K3 w - e6 0 1",        # no black pawn on e5
+    "4k3/8/8/8/3Pp3/8/8/4K3 b - d6 0 1",        # wrong rank for black to move
+    "4k3/8/3p4/3pP3/8/8/8/4K3 w - d6 0 1",      # d6 is occupied
+])
+def test_fen_rejects_impossible_en_passant_squares(fen):
+    with pytest.raises(ValueError):
+        Position.from_fen(fen)
+
+
+def test_fen_keeps_en_passant_only_when_a_pawn_can_take():
+    assert Position.from_fen("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1").ep_square == parse_square("d6")
+    assert Position.from_fen("4k3/8/8/8/3Pp3/8/8/4K3 b - d3 0 1").ep_square == parse_square("d3")
+    assert Position.from_fen("4k3/8/8/3p4/8/8/8/4K3 w - d6 0 1").ep_square == -1
+
+
+def test_counters_wrap_and_restore_rule_functions():
+    import perft as perft_module
+    original = chess_core.generate_legal_moves
+    COUNTERS.reset()
+    COUNTERS.enable()
+    try:
+        assert perft_module.perft(Position.from_fen(STARTING_FEN), 2) == 400
+    finally:
+        COUNTERS.disable()
+    assert chess_core.generate_legal_moves is original
+    assert perft_module.generate_legal_moves is original
+    assert COUNTERS.stats()["calls"]["generate_legal_moves"] == 21
+    assert COUNTERS.stats()["calls"]["make_move"] == 20
+
+
+def test_counters_count_valid_moves_by_piece_and_en_passant_trials():
+    position = play(Position.from_fen(STARTING_FEN), "e2 e4, a7 a6, e4 e5, d7 d5")
+    COUNTERS.reset()
+    COUNTERS.enable()
+    try:
+        chess_core.generate_legal_moves(position, position.turn)
+        assert chess_core.is_valid_move(position, 62, 45)   # g1 knight to f3
+    finally:
+        COUNTERS.disable()
+    stats = COUNTERS.stats()
+    assert stats["trial_moves"] == 1
+    assert stats["is_valid_move_by_piece"]["knight"] == 1
+
+
+def test_every_module_importing_a_timed_rule_is_instrumented():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for filename in sorted(os.listdir(root)):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(root, filename)) as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom) and node.module == "chess_core":
+                if any(alias.name in chess_core.TIMED_RULES for alias in node.names):
+                    assert filename[:-3] in chess_core.INSTRUMENTED_MODULES
+
+
+@pytest.mark.parametrize("policy, evicted", [("lru", "e2 e4"), ("fifo", "start")])
+def test_move_cache_counts_and_eviction_order(policy, evicted):
+    positions = {"start": Position.from_fen(STARTING_FEN),
+                 "e2 e4": play(Position.from_fen(STARTING_FEN), "e2 e4"),
+                 "d2 d4": play(Position.from_fen(STARTING_FEN), "d2 d4")}
+    cache = MoveCache(size=2, policy=policy)
+
+    def lookup(name):
+        position = positions[name]
+        assert cache.legal_moves(position, position.turn) == generate_legal_moves(position, position.turn)
+
+    for name in ("start", "e2 e4", "start"):
+        lookup(name)
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 2, 0)
+    lookup("d2 d4")
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (1, 3, 1, 2)
+    # LRU dropped e2 e4, used less recently than the start; FIFO dropped the start, cached first
+    for name in positions:
+        if name != evicted:
+            lookup(name)
+    assert (cache.hits, cache.misses) == (3, 3)
+    lookup(evicted)
+    assert (cache.hits, cache.misses) == (3, 4)
+
+
+def test_move_cache_resize_and_zero_size():
+    cache = MoveCache(size=4)
+    position = Position.from_fen(STARTING_FEN)
+    cache.legal_moves(position, "white")
+    cache.legal_moves(position, "black")
+    cache.resize(1)
+    assert (len(cache), cache.evictions) == (1, 1)
+    cache.resize(0)
+    cache.legal_moves(position, "white")
+    cache.legal_moves(position, "white")
+    assert (len(cache), cache.hits) == (0, 0)
+    assert cache.stats()["misses"] == 4
+    with pytest.raises(ValueError):
+        MoveCache(policy="random")
@@ -0,0 +1,28 @@
+"""PGN reading and replay"""
+from pgn import read_games, validate_game
+
+CASTLING_GAME = """[Event "Castling with zeros"]
+[Result "*"]
+
+1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. 0-0 Nf6 5. d3 d6 6. Nc3 0-0 7. Be3 Qe7
+8. Qd2 Be6 9. Rae1 Rad8 10. a3 {a comment} (10. h3 h6) a6 *
+"""
+
+
+def test_zero_castling_is_read_and_replayed():
+    games = list(read_games(CASTLING_GAME.splitlines()))
+    assert len(games) == 1
+    game = games[0]
+    assert game.headers["Event"] == "Castling with zeros"
+    assert game.moves[6] == "0-0" and game.moves[11] == "0-0"
+    assert len(game.moves) == 20
+    assert validate_game(game) == (20, None)
+
+
+def test_move_numbers_results_and_illegal_moves():
+    games = list(read_games(["1. e4 e5 2... Nf3 1-0", "1.e4 e5 2.Ke3 0-1"]))
+    assert [game.result for game in games] == ["1-0", "0-1"]
+    assert games[0].moves == ["e4", "e5", "Nf3"]
+    plies, error = validate_game(games[1], number=2)
+    assert plies == 2
+    assert (error.game, error.ply, error.san) == (2, 3, "Ke3")
@@ -0,0 +1,45 @@
+"""Alpha-beta search: mates, principal variations and the caller's position"""
+import pytest
+
+from chess_core import Position, generate_legal_moves, is_checkmate, make_move, move_name
+from search import MATE_SCORE, search
+from tablebase import Tablebases
+
+
+@pytest.fixture
+def no_tablebases(tmp_path):
+    """Tables from an empty directory, so the search never answers from tables built locally"""
+    return Tablebases(str(tmp_path))
+
+
+@pytest.mark.parametrize("fen, mate", [
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", "a1 a8"),
+    ("r5k1/8/8/8/8/8/5PPP/6K1 b - - 0 1", "a8 a1"),
+    ("k7/8/1K6/8/8/8/7Q/8 w - - 0 1", "h2 h8"),
+])
+def test_finds_mate_in_one(fen, mate, no_tablebases):
+    position = Position.from_fen(fen)
+    result = search(position, depth=3, tablebases=no_tablebases)
+    assert move_name(result.move) == mate
+    assert result.score == MATE_SCORE - 1
+    assert result.pv[0] == result.move
+    assert position.to_fen() == fen
+
+
+def test_principal_variation_is_legal_and_ends_in_mate(no_tablebases):
+    # Mate in two: any rook move off the b-file forces Kb8, then the rook mates on the 8th rank
+    position = Position.from_fen("k7/8/1K6/8/8/8/8/1R6 w - - 0 1")
+    result = search(position, depth=4, tablebases=no_tablebases)
+    assert result.score == MATE_SCORE - 3
+    for move in result.pv:
+        assert move in generate_legal_moves(position, position.turn)
+        make_move(position, move)
+    assert len(result.pv) == 3
+    assert is_checkmate(position, position.turn)
+
+
+def test_takes_a_hanging_queen(no_tablebases):
+    position = Position.from_fen("4k3/pp6/8/3q4/8/8/PP6/3RK3 w - - 0 1")
+    result = search(position, depth=3, tablebases=no_tablebases)
+    assert move_name(result.move) == "d1 d5"
+    assert result.nodes > 0 and result.depth == 3
@@ -0,0 +1,68 @@
+"""Game server played through GameClient over loopback"""
+import asyncio
+
+import pytest
+
+from server import DEFAULT_HOST, GameClient, GameServer
+
+
+def play(scenario, timeout: float = 10):
+    """Run scenario(white, black, server) against a fresh server on a free port"""
+    async def main():
+        server = GameServer()
+        tcp_server = await server.start(DEFAULT_HOST, 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        white = await GameClient.connect(DEFAULT_HOST, port)
+        black = await GameClient.connect(DEFAULT_HOST, port)
+        assert await white.expect("start") == "start 1 white"
+        assert await black.expect("start") == "start 1 black"
+        try:
+            await asyncio.wait_for(scenario(white, black, server), timeout)
+        finally:
+            for client in (white, black):
+                client.writer.close()
+            await asyncio.gather(*server.sessions)
+            tcp_server.close()
+            await tcp_server.wait_closed()
+    asyncio.run(main())
+
+
+async def closed(client: GameClient) -> bool:
+    return await client.reader.readline() == b""
+
+
+def test_fools_mate_ends_the_game_and_closes_both_connections():
+    async def scenario(white, black, server):
+        for mover, move in ((white, "f2 f3"), (black, "e7 e5"), (white, "g2 g4"), (black, "d8 h4")):
+            await mover.send(move)
+            for client in (white, black):
+                assert await client.expect("moved") == f"moved {'white' if mover is white else 'black'} {move}"
+        for client in (white, black):
+            assert await client.expect("end") == "end 0-1 checkmate"
+            assert await closed(client)
+        assert not server.games
+    play(scenario)
+
+
+def test_moving_out_of_turn_is_an_error():
+    async def scenario(white, black, server):
+        await black.send("e7 e5")
+        assert await black.expect("error") == "error Not your turn"
+        await white.send("e2 e5")
+        assert (await white.expect("error")).startswith("error ")
+        await white.send("e2 e4")
+        assert await black.expect("moved") == "moved white e2 e4"
+    play(scenario)
+
+
+@pytest.mark.parametrize("leaver", ["white", "black"])
+def test_disconnecting_mid_game_loses(leaver):
+    async def scenario(white, black, server):
+        await white.send("e2 e4")
+        await black.expect("moved")
+        gone, stays = (white, black) if leaver == "white" else (black, white)
+        await gone.close()
+        assert await stays.expect("end") == f"end {'0-1' if leaver == 'white' else '1-0'} disconnect"
+        assert await closed(stays)
+        assert not server.games
+    play(scenario)
@@ -0,0 +1,71 @@
+"""KRK tablebase built by retrograde analysis, checked against the rules"""
+import random
+
+import pytest
+
+from chess_core import Position, ROOK, generate_legal_moves, is_checkmate, is_stalemate, make_move
+from search import MATE_SCORE, search
+from tablebase import (DRAW, ILLEGAL, LOSS, TABLE_SIZE, WIN, Tablebases, _position, build_table,
+                       save_table, table_path)
+
+
+@pytest.fixture(scope="module")
+def krk(tmp_path_factory):
+    """The KRK table and Tablebases loading it from a fresh directory (takes a few seconds)"""
+    directory = tmp_path_factory.mktemp("tablebases")
+    values = build_table("KRK")
+    save_table(values, table_path(str(directory), "KRK"))
+    tablebases = Tablebases(str(directory))
+    yield values, tablebases
+    tablebases.close()
+
+
+def test_mates_in_zero_are_exactly_the_checkmates(krk):
+    values, _ = krk
+    rng = random.Random(0)
+    checked = 0
+    while checked < 2000:
+        index = rng.randrange(TABLE_SIZE)
+        if values[index] == ILLEGAL:
+            continue
+        side, white_king, black_king, rook = index >> 18, index >> 12 & 63, index >> 6 & 63, index & 63
+        position = _position(side, white_king, black_king, ROOK, rook)
+        assert (values[index] == 1) == is_checkmate(position, position.turn)
+        if values[index] == DRAW:
+            # White always wins from its own move; black draws by stalemate or taking the rook
+            assert side == 1
+            assert is_stalemate(position, position.turn) or any(
+                move >> 6 & 63 == rook for move in generate_legal_moves(position, position.turn))
+        checked += 1
+
+
+@pytest.mark.parametrize("fen, expected", [
+    ("6k1/8/6K1/8/8/8/8/R7 w - - 0 1", (WIN, 1)),
+    ("R5k1/8/6K1/8/8/8/8/8 b - - 0 1", (LOSS, 0)),
+    ("r7/8/8/8/8/6k1/8/6K1 b - - 0 1", (WIN, 1)),     # the rook on black's side, probed mirrored
+    ("k7/1R6/1K6/8/8/8/8/8 b - - 0 1", (DRAW, 0)),    # stalemate
+    ("8/8/8/8/8/2k5/2R5/K7 b - - 0 1", (DRAW, 0)),    # the rook is lost
+])
+def test_probe(krk, fen, expected):
+    _, tablebases = krk
+    assert tablebases.probe(Position.from_fen(fen)) == expected
+
+
+def test_best_moves_count_down_to_mate(krk):
+    _, tablebases = krk
+    position = Position.from_fen("8/8/8/4k3/8/8/8/R3K3 w - - 0 1")
+    result, plies = tablebases.probe(position)
+    assert result == WIN
+    for played in range(plies):
+        move, result, remaining = tablebases.best_move(position)
+        assert move in generate_legal_moves(position, position.turn)
+        assert remaining == plies - played
+        make_move(position, move)
+    assert is_checkmate(position, position.turn)
+
+
+def test_search_answers_from_the_table(krk):
+    _, tablebases = krk
+    result = search(Position.from_fen("6k1/8/6K1/8/8/8/8/R7 w - - 0 1"), depth=5, tablebases=tablebases)
+    assert result.depth == 0
+    assert result.score == MATE_SCORE - 1
@@ -0,0 +1,65 @@
+"""Transposition table: stored results, key checks and bucket replacement"""
+from tt import EXACT, LOWER, UPPER, TranspositionTable
+
+
+def bucket_keys(tt: TranspositionTable, count: int, bucket: int = 5):
+    """Distinct keys that all index the same bucket"""
+    return [bucket + (tt.mask + 1) * i + (1 << 40) for i in range(count)]
+
+
+def test_store_and_probe_round_trip():
+    tt = TranspositionTable(1)
+    key = 0x9E3779B97F4A7C15
+    assert tt.probe(key) is None
+    tt.store(key, 7, -31_000, UPPER, 12 | 28 << 6 | 4 << 12)
+    assert tt.probe(key) == (7, -31_000, UPPER, 12 | 28 << 6 | 4 << 12)
+    assert (tt.probes, tt.hits, tt.stores) == (2, 1, 1)
+
+
+def test_probe_rejects_other_keys_in_the_bucket():
+    tt = TranspositionTable(1)
+    stored, other = bucket_keys(tt, 2)
+    tt.store(stored, 3, 50, EXACT, 1)
+    assert tt.probe(other) is None
+    assert tt.probe(stored) is not None
+
+
+def test_same_key_without_a_move_keeps_the_old_move():
+    tt = TranspositionTable(1)
+    key = bucket_keys(tt, 1)[0]
+    tt.store(key, 2, 10, LOWER, 777)
+    tt.store(key, 4, 20, EXACT, 0)
+    assert tt.probe(key) == (4, 20, EXACT, 777)
+
+
+def test_bucket_keeps_the_deepest_result_and_replaces_the_second_slot():
+    tt = TranspositionTable(1)
+    deep, shallow, newer, deeper = bucket_keys(tt, 4)
+    tt.store(deep, 6, 1, EXACT, 1)
+    tt.store(shallow, 3, 2, EXACT, 2)       # shallower: second slot
+    tt.store(newer, 2, 3, EXACT, 3)         # second slot is always replaced
+    assert tt.probe(deep) is not None
+    assert tt.probe(shallow) is None
+    assert tt.probe(newer) is not None
+    assert tt.overwrites == 1
+    tt.store(deeper, 8, 4, EXACT, 4)        # at least as deep: takes the first slot
+    assert tt.probe(deep) is None
+    assert tt.probe(deeper) == (8, 4, EXACT, 4)
+
+
+def test_entries_from_an_older_search_are_replaced_first():
+    tt = TranspositionTable(1)
+    old, new = bucket_keys(tt, 2)
+    tt.store(old, 10, 0, EXACT, 1)
+    tt.new_search()
+    tt.store(new, 1, 0, EXACT, 2)
+    assert tt.probe(old) is None
+    assert tt.probe(new) == (1, 0, EXACT, 2)
+
+
+def test_table_size_is_bounded():
+    tt = TranspositionTable(1)
+    assert tt.size_mb <= 1
+    for key in range(1, 3 * len(tt.keys)):
+        tt.store(key * 0x9E3779B97F4A7C15 & (1 << 64) - 1, 1, 0, EXACT, 0)
+    assert len(tt.keys) == len(tt.data) == round(tt.size_mb * 1024 * 1024 / 16)
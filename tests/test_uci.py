@@ -0,0 +1,47 @@
+"""UCI front end driven over a real pipe, as a GUI runs it"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_engine(commands, until: str, timeout: float = 60):
+    """Send commands to `python -m chess uci`, read up to a line starting with until, then quit"""
+    engine = subprocess.Popen([sys.executable, "-m", "chess", "uci"], cwd=ROOT, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              start_new_session=True)
+    # On a hang, kill the search processes too, or they keep the pipes open
+    timer = threading.Timer(timeout, os.killpg, (engine.pid, signal.SIGKILL))
+    timer.start()
+    try:
+        engine.stdin.write("".join(command + "\n" for command in commands))
+        engine.stdin.flush()
+        lines = []
+        for line in engine.stdout:
+            lines.append(line.strip())
+            if line.startswith(until):
+                break
+        engine.stdin.write("quit\n")
+        engine.stdin.flush()
+        _, errors = engine.communicate()
+    finally:
+        timer.cancel()
+    return lines, engine.returncode, errors
+
+
+def test_go_with_threads_over_a_pipe():
+    lines, returncode, errors = run_engine(
+        ["uci", "setoption name Threads value 2", "position startpos", "go movetime 300"], "bestmove")
+    assert lines[-1].startswith("bestmove ") and lines[-1] != "bestmove 0000"
+    assert returncode == 0
+    assert "leaked" not in errors
+
+
+def test_go_single_threaded_over_a_pipe():
+    lines, returncode, _ = run_engine(["uci", "position startpos moves e2e4", "go depth 2"], "bestmove")
+    assert any(line.startswith("info depth 2") for line in lines)
+    assert lines[-1].startswith("bestmove ")
+    assert returncode == 0
@@ -0,0 +1,152 @@
+"""Fixed-size transposition table keyed by the position's Zobrist key.
+
+Entries live in two parallel arrays of 64-bit words, one holding the key and
+one the packed data, so the table costs 16 bytes per entry however many
+positions it sees. Entries are grouped in buckets of two: the first slot keeps
+the deepest result, the second is always overwritten.
+"""
+from array import array
+from typing import Optional, Tuple
+
+# Bound types stored with a score
+EXACT = 0
+LOWER = 1   # score is a lower bound (the search failed high)
+UPPER = 2   # score is an upper bound (the search failed low)
+
+ENTRY_BYTES = 16
+BUCKET_SIZE = 2
+DEFAULT_HASH_MB = 16
+
+# Packed data layout: move 15 bits | depth 7 bits | bound 2 bits | age 8 bits | score 32 bits
+_MOVE_MASK = (1 << 15) - 1
+_DEPTH_SHIFT = 15
+_BOUND_SHIFT = 22
+_AGE_SHIFT = 24
+_SCORE_SHIFT = 32
+_SCORE_OFFSET = 1 << 31
+MAX_STORED_DEPTH = 127
+
+
+def _pack(move: int, depth: int, bound: int, age: int, score: int) -> int:
+    return (move | min(depth, MAX_STORED_DEPTH) << _DEPTH_SHIFT | bound << _BOUND_SHIFT
+            | age << _AGE_SHIFT | (score + _SCORE_OFFSET) << _SCORE_SHIFT)
+
+
+def table_buckets(size_mb: float) -> int:
+    """Largest power-of-two bucket count that fits in size_mb"""
+    buckets = 1
+    while buckets * 2 * BUCKET_SIZE * ENTRY_BYTES <= size_mb * 1024 * 1024:
+        buckets *= 2
+    return buckets
+
+
+def table_bytes(size_mb: float) -> int:
+    """Bytes of buffer a table of size_mb lays itself over"""
+    return table_buckets(size_mb) * BUCKET_SIZE * ENTRY_BYTES
+
+
+class TranspositionTable:
+    """Bounded hash table of (depth, score, bound, best move) search results"""
+
+    def __init__(self, size_mb: float = DEFAULT_HASH_MB, buffer=None):
+        """Allocate the table, or lay it over ``buffer`` (e.g. shared memory) when given"""
+        buckets = table_buckets(size_mb)
+        entries = buckets * BUCKET_SIZE
+        self.mask = buckets - 1
+        if buffer is None:
+            self.keys = array("Q", [0]) * entries
+            self.data = array("Q", [0]) * entries
+        else:
+            self._view = memoryview(buffer)[:entries * ENTRY_BYTES].cast("Q")
+            self.keys = self._view[:entries]
+            self.data = self._view[entries:]
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def close(self):
+        """Drop references into an external buffer so it can be released"""
+        if isinstance(self.keys, memoryview):
+            self.keys.release()
+            self.data.release()
+            self._view.release()
+
+    @property
+    def size_mb(self) -> float:
+        return len(self.keys) * ENTRY_BYTES / (1024 * 1024)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def new_search(self):
+        """Start a new search so entries from older ones are replaced first"""
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self):
+        for i in range(len(self.keys)):
+            self.keys[i] = 0
+            self.data[i] = 0
+        self.age = 0
+        self.probes = self.hits = self.stores = self.overwrites = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, int, int]]:
+        """Return (depth, score, bound, move) stored for key, or None"""
+        self.probes += 1
+        index = (key & self.mask) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        for slot in (index, index + 1):
+            # Keys are stored xor'ed with their data so a torn write never matches
+            entry = data[slot]
+            if keys[slot] ^ entry == key and entry:
+                self.hits += 1
+                return (entry >> _DEPTH_SHIFT & 0x7F, (entry >> _SCORE_SHIFT) - _SCORE_OFFSET,
+                        entry >> _BOUND_SHIFT & 3, entry & _MOVE_MASK)
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: int):
+        """Save a search result, keeping the deeper one in the first slot of the bucket"""
+        self.stores += 1
+        index = (key & self.mask) * BUCKET_SIZE
+        keys = self.keys
+        data = self.data
+        entry = _pack(move, depth, bound, self.age, score)
+
+        old = data[index]
+        same_key = keys[index] ^ old == key
+        if (not old or same_key or old >> _AGE_SHIFT & 0xFF != self.age
+                or depth >= old >> _DEPTH_SHIFT & 0x7F):
+            if same_key and not move:
+                # Keep the best move found by an earlier search of this position
+                entry |= old & _MOVE_MASK
+            if old and not same_key:
+                self.overwrites += 1
+            slot = index
+        else:
+            slot = index + 1
+            if data[slot] and keys[slot] ^ data[slot] != key:
+                self.overwrites += 1
+        data[slot] = entry
+        keys[slot] = key ^ entry
+
+    def usage(self, sample: int = 1000) -> float:
+        """Fraction of the first ``sample`` slots filled during the current search"""
+        sample = min(sample, len(self.data))
+        used = sum(1 for i in range(sample)
+                   if self.data[i] and self.data[i] >> _AGE_SHIFT & 0xFF == self.age)
+        return used / sample if sample else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size_mb": round(self.size_mb, 2),
+            "entries": len(self.keys),
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 4),
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "usage": round(self.usage(), 4),
+        }
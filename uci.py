@@ -0,0 +1,246 @@
+"""UCI (Universal Chess Interface) front end.
+
+Lets tournament managers and analysis GUIs drive the engine over stdin and
+stdout. Commands are read on the main thread while ``go`` searches on a
+worker thread, so ``stop``, ``isready`` and ``quit`` are answered during a
+search; ``stop`` sets the search's stop event, which it polls every
+CHECK_INTERVAL nodes.
+
+Run with ``python -m chess uci``.
+"""
+import argparse
+import sys
+import threading
+from typing import List, Optional, TextIO
+
+from chess_core import (Position, STARTING_FEN, generate_legal_moves, make_move, move_name,
+                        parse_square, find_move, PROMOTION_SYMBOLS)
+from search import search, SearchResult, MATE_SCORE, MATE_BOUND, MAX_DEPTH
+from tt import TranspositionTable, DEFAULT_HASH_MB
+from instrument import SessionStats, add_arguments, instrumented
+
+ENGINE_NAME = "Python Chess"
+ENGINE_AUTHOR = "Python Chess contributors"
+
+MIN_HASH_MB = 1
+MAX_HASH_MB = 4096
+MAX_THREADS = 64
+
+# Time kept in reserve for communication when the clock is running
+MOVE_OVERHEAD = 0.05
+# Moves assumed left in the game when the GUI does not send movestogo
+DEFAULT_MOVES_TO_GO = 30
+
+
+def uci_move(move: int) -> str:
+    """Move in UCI long algebraic notation, e.g. 'e2e4' or 'e7e8q'"""
+    return move_name(move).replace(" ", "")
+
+
+def parse_uci_move(position: Position, text: str) -> int:
+    """Find the legal move named by a UCI move string"""
+    start = parse_square(text[:2])
+    end = parse_square(text[2:4])
+    if text[4:] and text[4:] not in PROMOTION_SYMBOLS:
+        raise ValueError(f"Invalid promotion in move: {text!r}")
+    move = find_move(generate_legal_moves(position, position.turn), start, end,
+                     PROMOTION_SYMBOLS.get(text[4:], 0))
+    if move is None:
+        raise ValueError(f"Illegal move: {text!r}")
+    return move
+
+
+def format_score(score: int) -> str:
+    if abs(score) >= MATE_BOUND:
+        plies = MATE_SCORE - abs(score)
+        moves = (plies + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def time_for_move(position: Position, options: dict) -> Optional[float]:
+    """Seconds to spend on this move from the go parameters, None for no time limit"""
+    if "movetime" in options:
+        return max(options["movetime"] / 1000 - MOVE_OVERHEAD, 0.01)
+    remaining = options.get("wtime" if position.side == 0 else "btime")
+    if remaining is None:
+        return None
+    increment = options.get("winc" if position.side == 0 else "binc", 0)
+    moves_to_go = options.get("movestogo", DEFAULT_MOVES_TO_GO)
+    budget = remaining / moves_to_go + increment * 0.8
+    return max(min(budget, remaining / 2) / 1000 - MOVE_OVERHEAD, 0.01)
+
+
+class UCIEngine:
+    """Engine state and command handlers for one UCI session"""
+
+    def __init__(self, output: TextIO = sys.stdout, stats: Optional[SessionStats] = None):
+        self.output = output
+        self.stats = stats
+        self.output_lock = threading.Lock()
+        self.position = Position.from_fen(STARTING_FEN)
+        self.hash_mb = DEFAULT_HASH_MB
+        self.threads = 1
+        self.tt = TranspositionTable(self.hash_mb)
+        if stats is not None:
+            stats.tt = self.tt
+        self.stop_event = threading.Event()
+        self.search_thread: Optional[threading.Thread] = None
+
+    def send(self, line: str):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        """Run one command; returns False on quit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} "
+                      f"min {MIN_HASH_MB} max {MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.new_table()
+        elif command == "setoption":
+            self.stop()
+            self.set_option(args)
+        elif command == "position":
+            self.stop()
+            self.set_position(args)
+        elif command == "go":
+            self.stop()
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        else:
+            self.send(f"info string Unknown command: {command}")
+        return True
+
+    def set_option(self, args: List[str]):
+        if "name" not in args or "value" not in args:
+            return
+        name = " ".join(args[args.index("name") + 1:args.index("value")]).lower()
+        value = " ".join(args[args.index("value") + 1:])
+        try:
+            if name == "hash":
+                self.hash_mb = min(max(int(value), MIN_HASH_MB), MAX_HASH_MB)
+                self.new_table()
+            elif name == "threads":
+                self.threads = min(max(int(value), 1), MAX_THREADS)
+                self.start_workers()
+            else:
+                self.send(f"info string Unknown option: {name}")
+        except ValueError:
+            self.send(f"info string Invalid value for {name}: {value}")
+
+    def new_table(self):
+        self.tt = TranspositionTable(self.hash_mb)
+        if self.stats is not None:
+            self.stats.tt = self.tt
+        self.start_workers()
+
+    def start_workers(self):
+        """Start the search processes for threads > 1 here, on the thread reading commands"""
+        if self.threads > 1:
+            from parallel import shared_searcher
+            shared_searcher(self.threads, self.tt.size_mb)
+
+    def set_position(self, args: List[str]):
+        moves_at = args.index("moves") if "moves" in args else len(args)
+        try:
+            if args[:1] == ["startpos"]:
+                position = Position.from_fen(STARTING_FEN)
+            elif args[:1] == ["fen"]:
+                position = Position.from_fen(" ".join(args[1:moves_at]))
+            else:
+                raise ValueError("position needs 'startpos' or 'fen'")
+            for text in args[moves_at + 1:]:
+                make_move(position, parse_uci_move(position, text))
+        except ValueError as e:
+            self.send(f"info string {e}")
+            return
+        self.position = position
+
+    def go(self, args: List[str]):
+        options = {}
+        for name in ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "depth", "nodes"):
+            if name in args:
+                try:
+                    options[name] = int(args[args.index(name) + 1])
+                except (IndexError, ValueError):
+                    self.send(f"info string Invalid value for {name}")
+                    return
+        infinite = "infinite" in args
+        time_limit = None if infinite else time_for_move(self.position, options)
+        depth = options.get("depth")
+        if time_limit is None and depth is None:
+            depth = MAX_DEPTH   # infinite: search until stopped
+        self.stop_event.clear()
+        self.search_thread = threading.Thread(
+            target=self.run_search,
+            args=(self.position.copy(), time_limit, depth, options.get("nodes"), infinite),
+            daemon=True)
+        self.search_thread.start()
+
+    def run_search(self, position: Position, time_limit: Optional[float], depth: Optional[int],
+                   nodes: Optional[int], infinite: bool = False):
+        kwargs = dict(time_limit=time_limit, depth=depth, nodes=nodes, tt=self.tt, threads=self.threads,
+                      stop_event=self.stop_event, info=self.send_info)
+        if self.stats is None:
+            result = search(position, **kwargs)
+        else:
+            result = self.stats.call(search, position, **kwargs)
+            self.stats.record_move("engine", result.time, result.nodes)
+        if infinite:
+            # The search can end by itself (a mate found, a tablebase hit), but
+            # in infinite mode bestmove may only follow stop or quit
+            self.stop_event.wait()
+        self.send(f"bestmove {uci_move(result.move)}" if result.move is not None else "bestmove 0000")
+
+    def send_info(self, result: SearchResult):
+        milliseconds = max(int(result.time * 1000), 1)
+        self.send(f"info depth {result.depth} score {format_score(result.score)} "
+                  f"nodes {result.nodes} nps {result.nodes * 1000 // milliseconds} "
+                  f"time {milliseconds} pv {' '.join(uci_move(move) for move in result.pv)}")
+
+    def stop(self):
+        """Stop a running search; its bestmove is sent before this returns"""
+        if self.search_thread is not None:
+            self.stop_event.set()
+            self.search_thread.join()
+            self.search_thread = None
+
+
+def run_uci(input_stream: TextIO = sys.stdin, output: TextIO = sys.stdout,
+            stats: Optional[SessionStats] = None):
+    """Read UCI commands until quit or end of input"""
+    engine = UCIEngine(output, stats)
+    for line in input_stream:
+        if not engine.handle(line):
+            return
+    engine.stop()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m chess uci", description="Run the engine over UCI")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    with instrumented(args.stats, args.profile) as stats:
+        run_uci(stats=stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())